@@ -0,0 +1,208 @@
+###############################################################################
+#
+# rush_hour/batch.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the logic to solve batches of puzzles from the
+database in parallel.  Puzzles are distributed over a pool of worker
+processes, each of which opens the puzzle database once when it starts.
+
+Each puzzle is solved under an optional time limit and memory limit, so a
+single pathological puzzle cannot stall or kill the whole batch.  The time
+limit is enforced using a timer signal in the worker, the memory limit by
+limiting the address space of the worker.  Puzzles that exceed either limit
+are reported with status "timeout" or "out of memory".
+
+A worker can still die, for example if the memory limit is hit outside the
+solver or the operating system kills it.  This breaks the pool, and all
+puzzles not finished at the time fail with it, even though only the ones
+being solved by the dead worker are to blame.  The batch then continues with
+the unfinished puzzles in isolation: each worker becomes a pool of its own,
+so the death of a worker identifies the puzzle that caused it.  This puzzle
+is reported with status "worker died", and its worker is replaced.  A puzzle
+whose solver raises any other exception is reported with status "error".
+
+Puzzles are dispatched to the workers either in the order given or longest
+first, in decreasing order of the cost estimated by rush_hour.estimate.
+Dispatching the most expensive puzzles first lets the cheap ones fill the
+workers that would otherwise sit idle while the last expensive puzzle is
+solved, which shortens the time until the whole batch is done."""
+
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, \
+    as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+import gc
+import os
+import resource
+import signal
+import time
+from rush_hour import estimate, solver
+from rush_hour.puzzle_db import DEFAULT_PATH, PuzzleDB
+
+
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+TIMEOUT = "timeout"
+OUT_OF_MEMORY = "out of memory"
+NOT_FOUND = "no such puzzle"
+WORKER_DIED = "worker died"
+ERROR = "error"
+
+IN_ORDER = "given"
+LONGEST_FIRST = "longest"
+ORDERS = (IN_ORDER, LONGEST_FIRST)
+
+_database = None
+
+
+class _Timeout(Exception):
+    """Raised in a worker when the time limit for a puzzle expires."""
+
+
+def run_batch(numbers, jobs=None, strategy="bfs", timeout=None,
+              memory_limit=None, path=DEFAULT_PATH, order=IN_ORDER):
+    """Solve the puzzles with the given numbers using a pool of jobs worker
+    processes (one per core by default).  timeout is the time limit per puzzle
+    in seconds and memory_limit the memory limit per worker in bytes; None
+    means no limit.  order is one of ORDERS and determines the order in which
+    the puzzles are dispatched to the workers.  This is an iterator that
+    yields the result of every puzzle as soon as it is available, in the
+    format returned by solve_puzzle."""
+    if order == LONGEST_FIRST:
+        numbers = estimate.longest_first(
+            numbers, estimate.estimate_numbers(numbers, path))
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                   initargs=(path, memory_limit))
+    try:
+        futures = {executor.submit(solve_puzzle, number, strategy, timeout):
+                   number for number in numbers}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                break
+            except Exception:
+                result = _failed(futures[future], ERROR)
+            del futures[future]
+            yield result
+    finally:
+        executor.shutdown(cancel_futures=True)
+    if futures:
+        yield from _run_isolated(list(futures.values()), jobs, strategy,
+                                 timeout, memory_limit, path)
+
+
+def _run_isolated(numbers, jobs, strategy, timeout, memory_limit, path):
+    """Solve the puzzles with the given numbers like run_batch, but using
+    jobs pools of one worker each, so a puzzle whose worker dies can be
+    identified.  Its pool is replaced by a new one."""
+    numbers = iter(numbers)
+    running = {}
+
+    def start(executor):
+        """Submit the next puzzle to the given pool, if there is one left.
+        Otherwise, shut the pool down."""
+        number = next(numbers, None)
+        if number is None:
+            executor.shutdown()
+            return
+        future = executor.submit(solve_puzzle, number, strategy, timeout)
+        running[future] = (number, executor)
+
+    def new_pool():
+        """Start a new pool of one worker."""
+        return ProcessPoolExecutor(max_workers=1, initializer=init_worker,
+                                   initargs=(path, memory_limit))
+
+    try:
+        for _ in range(jobs or os.cpu_count() or 1):
+            start(new_pool())
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                number, executor = running.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    executor.shutdown()
+                    executor = new_pool()
+                    yield _failed(number, WORKER_DIED)
+                except Exception:
+                    yield _failed(number, ERROR)
+                start(executor)
+    finally:
+        for (_, executor) in running.values():
+            executor.shutdown(cancel_futures=True)
+
+
+def _failed(number, status):
+    """Return the result of the puzzle with the given number in the format
+    returned by solve_puzzle if the puzzle could not be solved because of the
+    given status."""
+    return number, None, status, 0.0, 0, None, 0
+
+
+def init_worker(path, memory_limit):
+    """Open the puzzle database and apply the memory limit in a new worker
+    process."""
+    global _database
+    _database = PuzzleDB(path)
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    signal.signal(signal.SIGALRM, _expire)
+
+
+def _expire(signum, frame):
+    """Signal handler for the timer that enforces the time limit."""
+    raise _Timeout()
+
+
+def solve_puzzle(number, strategy="bfs", timeout=None):
+    """Solve the puzzle with the given number in a worker process.  Return a
+    tuple (number, puzzle, status, wall_time, states, solution, peak_rss),
+    where puzzle is the puzzle string, status is NOT_FOUND if there is no
+    such puzzle, and the remaining fields are as returned by solve_board."""
+    try:
+        puzzle = _database.puzzle(number)[1]
+    except IndexError:
+        return number, None, NOT_FOUND, 0.0, 0, None, 0
+    return (number, puzzle) + solve_board(puzzle, strategy, timeout)
+
+
+def solve_board(puzzle, strategy="bfs", timeout=None):
+    """Solve the given puzzle string in a worker process.  Return a tuple
+    (status, wall_time, states, solution, peak_rss), where status is one of
+    SOLVED, UNSOLVABLE, TIMEOUT, and OUT_OF_MEMORY, wall_time is the time
+    spent in the solver in seconds, states is the number of states the solver
+    discovered, solution is the list of moves (or None), and peak_rss is the
+    peak resident set size of the worker process so far in kilobytes.  Since
+    workers solve many puzzles, peak_rss is an upper bound on the memory used
+    by this puzzle."""
+    search = solution = None
+    start = time.perf_counter()
+    try:
+        if timeout is not None:
+            if timeout <= 0:
+                raise _Timeout()
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        search = solver.make_solver(puzzle, strategy)
+        solution = search.run()
+        status = SOLVED if solution else UNSOLVABLE
+    except _Timeout:
+        status = TIMEOUT
+    except MemoryError:
+        status = OUT_OF_MEMORY
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    wall_time = time.perf_counter() - start
+    states = search.states_seen if search else 0
+    del search
+    gc.collect()
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return status, wall_time, states, solution, peak_rss
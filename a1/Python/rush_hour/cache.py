@@ -0,0 +1,189 @@
+###############################################################################
+#
+# rush_hour/cache.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a persistent cache of puzzle solutions.
+
+Solutions are keyed by the packed state of the puzzle (see
+rush_hour.state.pack).  The state only records which cells are occupied by
+horizontal and vertical pieces and where pieces end, not the letters used to
+name the pieces, so puzzles that differ only in the naming of their pieces
+share a cache entry.
+
+The cache is an sqlite table with one row per puzzle, storing the key, the
+solution as an array of 16-bit moves (NULL for unsolvable puzzles), and the
+time the entry was last used.  When the table grows beyond its capacity, the
+least recently used entries are evicted.  The most recently used entries are
+also kept in memory, so repeated lookups of the same puzzles do not touch the
+database.  The times at which these entries are used are collected and
+written to the database in one go before entries are evicted and when the
+cache is closed, so eviction sees them."""
+
+
+from array import array
+from collections import OrderedDict
+import sqlite3
+import sys
+import time
+import rush_hour.state as st
+from rush_hour import solver
+
+
+DEFAULT_PATH = "../solution-cache.sqlite"
+
+
+class SolutionCache:
+    """A persistent cache of solutions with an in-memory LRU layer"""
+
+    def __init__(self, path=DEFAULT_PATH, capacity=1000000,
+                 memory_capacity=1024):
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS solutions ("
+                         "key BLOB PRIMARY KEY, moves BLOB, used REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS solutions_used "
+                         "ON solutions (used)")
+        self._capacity = capacity
+        self._count = len(self)
+        self._memory = OrderedDict()
+        self._memory_capacity = memory_capacity
+        self._used = {}
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def close(self):
+        """Write all pending changes and close the database."""
+        self._write_used()
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def solve(self, puzzle, strategy="bfs", **options):
+        """Solve the given puzzle using solver.run, unless its solution is
+        already in the cache.  A search that runs out of its budget is not
+        cached."""
+        key = key_of(puzzle)
+        found, solution = self.lookup(key)
+        if not found:
+            solution = solver.run(puzzle, strategy, **options)
+            if not isinstance(solution, solver.BudgetExceeded):
+                self.store(key, solution)
+        return solution
+
+    def lookup(self, key):
+        """Look up the solution for the given key.  Return a pair consisting
+        of a flag indicating whether the key was found and the solution, which
+        is None for unsolvable puzzles."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self._used[key] = time.time()
+            self.hits += 1
+            self.memory_hits += 1
+            return True, self._memory[key]
+        row = self._db.execute("SELECT moves FROM solutions WHERE key = ?",
+                               (_encode_key(key),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._db.execute("UPDATE solutions SET used = ? WHERE key = ?",
+                         (time.time(), _encode_key(key)))
+        solution = _decode_moves(row[0])
+        self._remember(key, solution)
+        return True, solution
+
+    def store(self, key, solution):
+        """Store the solution for the given key, which is None for unsolvable
+        puzzles, evicting the least recently used entries if the cache is
+        full."""
+        encoded_key, moves, now = \
+            _encode_key(key), _encode_moves(solution), time.time()
+        if self._db.execute("INSERT OR IGNORE INTO solutions VALUES (?, ?, ?)",
+                            (encoded_key, moves, now)).rowcount:
+            self._count += 1
+        else:
+            self._db.execute("UPDATE solutions SET moves = ?, used = ? "
+                             "WHERE key = ?", (moves, now, encoded_key))
+        self._used.pop(key, None)
+        excess = self._count - self._capacity
+        if excess > 0:
+            self._write_used()
+            self._db.execute("DELETE FROM solutions WHERE key IN ("
+                             "SELECT key FROM solutions ORDER BY used "
+                             "LIMIT ?)", (excess,))
+            self._count -= excess
+            self.evictions += excess
+        self._db.commit()
+        self._remember(key, solution)
+
+    def print_stats(self, file=sys.stderr):
+        """Print the hit and miss counters and the size of the cache."""
+        lookups = self.hits + self.misses
+        print("Cache lookups     =", lookups, file=file)
+        print("Cache hits        = {} ({} in memory)".format(
+            self.hits, self.memory_hits), file=file)
+        print("Cache misses      =", self.misses, file=file)
+        print("Cache evictions   =", self.evictions, file=file)
+        print("Cache entries     =", len(self), file=file)
+
+    def _write_used(self):
+        """Write the times at which entries were used in memory to the
+        database."""
+        self._db.executemany("UPDATE solutions SET used = ? WHERE key = ?",
+                             [(used, _encode_key(key))
+                              for (key, used) in self._used.items()])
+        self._used.clear()
+
+    def _remember(self, key, solution):
+        """Add the given entry to the in-memory layer, dropping the least
+        recently used entry if the layer is full."""
+        self._memory[key] = solution
+        self._memory.move_to_end(key)
+        if len(self._memory) > self._memory_capacity:
+            self._memory.popitem(last=False)
+
+
+def key_of(puzzle):
+    """Return the cache key of the given puzzle string."""
+    return st.pack(st.from_string_rep(puzzle))
+
+
+def _encode_key(key):
+    """Encode a packed state as a 16-byte blob."""
+    return key.to_bytes(16, "little")
+
+
+def _encode_moves(solution):
+    """Encode a list of moves as a blob, or None for unsolvable puzzles."""
+    if solution is None:
+        return None
+    moves = array("H", solution)
+    if sys.byteorder == "big":
+        moves.byteswap()
+    return moves.tobytes()
+
+
+def _decode_moves(blob):
+    """Decode a blob produced by _encode_moves."""
+    if blob is None:
+        return None
+    moves = array("H")
+    moves.frombytes(blob)
+    if sys.byteorder == "big":
+        moves.byteswap()
+    return list(moves)
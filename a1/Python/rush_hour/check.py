@@ -0,0 +1,144 @@
+###############################################################################
+#
+# rush_hour/check.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the logic to check solution files, one at a time or
+whole directories of them in parallel.
+
+A solution file lists the puzzle string on its first line and one move of the
+form (row,col)+offset or (row,col)-offset per line after that.  A solution is
+checked by replaying its moves from the puzzle's start state and testing
+whether the final state is solved, and by comparing the number of moves with
+the number of optimal moves recorded in the puzzle database.  Only the final
+state is kept, so checking a solution allocates no more than a handful of
+states.  Callers that want to display the states of a failed solution can
+reconstruct them using replay."""
+
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+import rush_hour.state as st
+from rush_hour.puzzle_db import DEFAULT_PATH, PuzzleDB
+
+
+OPTIMAL = "optimal"
+VALID = "valid"
+INVALID = "invalid"
+UNKNOWN = "unknown puzzle"
+STATUSES = (OPTIMAL, VALID, INVALID, UNKNOWN)
+
+MOVE_PATTERN = re.compile(r"\((\d),(\d)\)([+-]\d)$")
+
+_database = None
+
+
+def parse_solution(file):
+    """Read a solution from the given open file.  Return a pair consisting of
+    the puzzle string and the list of moves.  Raise ValueError if the file is
+    not a well-formed solution."""
+    puzzle = next(file, "").strip()
+    if len(puzzle) != 36:
+        raise ValueError("The puzzle given in the solution is not a valid "
+                         "puzzle")
+    moves = []
+    for line in file:
+        match = MOVE_PATTERN.match(line.rstrip("\n"))
+        if not match:
+            raise ValueError("{} is not a valid move descriptor".format(
+                line.rstrip("\n")))
+        pos = (int(match[1]) << 3) + int(match[2])
+        offset = int(match[3])
+        if not 0 < abs(offset) <= 4:
+            raise ValueError("{} is not a valid move descriptor".format(
+                line.rstrip("\n")))
+        moves.append(st.make_move(pos, offset))
+    return puzzle, moves
+
+
+def replay(puzzle, moves):
+    """Apply the given moves to the start state of the given puzzle.  Return
+    a pair consisting of the final state and the number of moves applied,
+    which is less than the number of moves if the next move is invalid."""
+    state = st.from_string_rep(puzzle)
+    for (count, move) in enumerate(moves):
+        next_state = st.apply_move(state, move)
+        if not next_state:
+            return state, count
+        state = next_state
+    return state, len(moves)
+
+
+def check_solution(puzzle, moves, database):
+    """Check the given solution of the given puzzle against the given puzzle
+    database.  Return a tuple (status, optimal_moves, applied, message),
+    where status is one of the statuses in STATUSES, optimal_moves is the
+    number of optimal moves recorded in the database (None if the puzzle is
+    not in the database), applied is the number of moves that could be
+    applied, and message explains why the solution is invalid (None for
+    valid solutions)."""
+    state, applied = replay(puzzle, moves)
+    info = database.lookup(puzzle)
+    optimal_moves = info[1] if info else None
+    if applied < len(moves):
+        return INVALID, optimal_moves, applied, "Invalid move {}".format(
+            format_move(moves[applied]))
+    if not st.is_solved(state):
+        return INVALID, optimal_moves, applied, "Final state is not solved"
+    if info is None:
+        return UNKNOWN, None, applied, None
+    return (OPTIMAL if optimal_moves == len(moves) else VALID, optimal_moves,
+            applied, None)
+
+
+def format_move(move):
+    """Format the given move as in solution files."""
+    pos = move >> 8
+    return "({},{}){:+}".format(pos >> 3, pos & 7, (move & 0xff) - 4)
+
+
+def check_directory(directory, jobs=None, path=DEFAULT_PATH):
+    """Check all files with extension .sol in the given directory using a pool
+    of jobs worker processes (one per core by default), each of which opens
+    the puzzle database at the given path once.  This is an iterator that
+    yields the result of every file, in the format returned by check_file, in
+    the order of the file names."""
+    paths = sorted(os.path.join(directory, name)
+                   for name in os.listdir(directory) if name.endswith(".sol"))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(path,)) as executor:
+        yield from executor.map(check_file, paths, chunksize=32)
+
+
+def _init_worker(path):
+    """Open the puzzle database in a new worker process."""
+    global _database
+    _database = PuzzleDB(path)
+
+
+def check_file(path):
+    """Check the solution in the given file in a worker process.  Return a
+    tuple (path, status, puzzle, moves, optimal_moves, applied, message),
+    where moves is the list of moves in the solution and the other fields
+    are as returned by check_solution.  Files that are not well-formed
+    solutions are reported as invalid, with puzzle and moves None, and so
+    are solutions whose replay fails for any other reason, so one bad file
+    does not stop a whole directory."""
+    try:
+        with open(path, "r") as file:
+            puzzle, moves = parse_solution(file)
+    except (OSError, UnicodeDecodeError, ValueError) as error:
+        return path, INVALID, None, None, None, 0, str(error)
+    try:
+        status, optimal_moves, applied, message = check_solution(
+            puzzle, moves, _database)
+    except Exception as error:
+        return path, INVALID, puzzle, moves, None, 0, \
+            "Cannot replay the solution: {}".format(error)
+    return path, status, puzzle, moves, optimal_moves, applied, message
@@ -0,0 +1,327 @@
+###############################################################################
+#
+# rush_hour/cluster.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides distance tables for whole clusters of states.
+
+A cluster is the set of all states reachable from a given state.  Its
+distance table lists every state of the cluster together with the number of
+moves needed to reach a solved state from it, computed by a BFS that starts
+from all solved states of the cluster at once.  Given this table, any state of
+the cluster can be solved without search: from every unsolved state, some
+move leads to a state one move closer to a solved state.
+
+A distance table is stored as an array of packed states (see
+rush_hour.state.pack) in sorted order, each stored as two 64-bit words (low
+word first), followed by an array of distances, one byte per state.  States
+from which no solved state can be reached have distance UNREACHABLE.  On
+disk, the two arrays are preceded by a 16-byte header consisting of the magic
+bytes RHCL, the format version, the number of states, and a reserved word.
+All words are little-endian.  Tables are memory-mapped when loaded and
+searched by binary search.
+
+ClusterStore keeps the tables of all clusters built so far in a directory.
+All states of a cluster have the same pieces in the same order in every row
+and column, so tables are filed under a signature describing this layout, and
+only the tables with the signature of a puzzle need to be searched for it.
+Several processes may share a store, so a new table is written to a
+temporary file first and then linked to the first free name, which fails
+instead of overwriting a table another process stored under the same name.
+ClusterSolver makes this available as the "cluster" strategy of
+rush_hour.solver."""
+
+
+from array import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import rush_hour.state as st
+from rush_hour.table import StateTable
+
+
+DEFAULT_DIRECTORY = "../clusters"
+UNREACHABLE = 255
+
+_MAGIC = b"RHCL"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+_WORD_MASK = 0xffffffffffffffff
+
+
+def explore(start_state):
+    """Return a StateTable containing all states reachable from the given
+    state."""
+    seen = StateTable()
+    seen.add(st.pack(start_state))
+    index = 0
+    while index < len(seen):
+        for (next_state, move) in st.successors(st.unpack(seen.key(index))):
+            seen.add(st.pack(next_state), index, move)
+        index += 1
+    return seen
+
+
+def solve_distances(seen):
+    """Given a StateTable containing all states of a cluster, return an array
+    listing the distance of every state of the table from the nearest solved
+    state, computed by a BFS that starts from all solved states at once, and
+    the number of states expanded by this BFS."""
+    count = len(seen)
+    expanded = 0
+    distances = array("B", [UNREACHABLE]) * count
+    level = [index for index in range(count)
+             if st.is_solved(st.unpack(seen.key(index)))]
+    for index in level:
+        distances[index] = 0
+    dist = 0
+    while level:
+        dist += 1
+        next_level = []
+        expanded += len(level)
+        for index in level:
+            for (next_state, _) in st.successors(st.unpack(seen.key(index))):
+                next_index = seen.index(st.pack(next_state))
+                if distances[next_index] == UNREACHABLE:
+                    distances[next_index] = min(dist, UNREACHABLE - 1)
+                    next_level.append(next_index)
+        level = next_level
+    return distances, expanded
+
+
+def signature(state):
+    """Return a string identifying the arrangement of pieces in the rows and
+    columns of the given state, which all states of its cluster share."""
+    lines = {}
+    for (end, length, horizontal) in st.pieces(state):
+        line = ("h", end >> 3) if horizontal else ("v", end & 7)
+        lines.setdefault(line, []).append(str(length))
+    layout = ";".join("{}{}:{}".format(kind, line, ",".join(lengths))
+                      for ((kind, line), lengths) in sorted(lines.items()))
+    return hashlib.sha1(layout.encode()).hexdigest()[:16]
+
+
+class ClusterTable:
+    """The distance table of a cluster"""
+
+    def __init__(self, keys, distances, expanded=0):
+        """Construct a table from the given arrays of keys and distances.
+        expanded is the number of states expanded to build the table."""
+        self._keys = keys
+        self._distances = distances
+        self._map = None
+        self.expanded = expanded
+
+    @classmethod
+    def build(cls, start_state):
+        """Build the distance table of the cluster containing the given
+        state."""
+        seen = explore(start_state)
+        count = len(seen)
+        distances, expanded = solve_distances(seen)
+        expanded += count
+        order = sorted(range(count), key=seen.key)
+        keys = array("Q")
+        for index in order:
+            key = seen.key(index)
+            keys.append(key & _WORD_MASK)
+            keys.append(key >> 64)
+        return cls(keys, array("B", (distances[index] for index in order)),
+                   expanded)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map the distance table stored in the given file."""
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, _ = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC or version != _VERSION:
+            mapped.close()
+            raise ValueError("{} is not a cluster table".format(path))
+        view = memoryview(mapped)
+        keys_end = _HEADER.size + 16 * count
+        keys = view[_HEADER.size:keys_end].cast("Q")
+        if sys.byteorder == "big":
+            keys = array("Q", keys)
+            keys.byteswap()
+        table = cls(keys, view[keys_end:keys_end + count])
+        table._map = mapped
+        return table
+
+    def save(self, path):
+        """Store the distance table in the given file."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            self._write(file)
+        os.replace(tmp_path, path)
+
+    def _write(self, file):
+        """Write the distance table to the given binary file."""
+        keys = array("Q", self._keys)
+        if sys.byteorder == "big":
+            keys.byteswap()
+        file.write(_HEADER.pack(_MAGIC, _VERSION, len(self), 0))
+        file.write(keys.tobytes())
+        file.write(bytes(self._distances))
+
+    def __len__(self):
+        return len(self._distances)
+
+    def __contains__(self, state):
+        return self._find(st.pack(state)) >= 0
+
+    def distance(self, state):
+        """Return the number of moves needed to solve the given state, or None
+        if the state is not in the cluster or cannot be solved."""
+        index = self._find(st.pack(state))
+        if index < 0 or self._distances[index] == UNREACHABLE:
+            return None
+        return self._distances[index]
+
+    def solve(self, state):
+        """Return an optimal sequence of moves that solves the given state, or
+        None if the state is not in the cluster or cannot be solved.  In every
+        step, the solution moves to a successor that is one move closer to a
+        solved state.  Like the other solvers, the solution of a solved state
+        is the shortest sequence of at least one move that leads to a solved
+        state again."""
+        dist = self.distance(state)
+        if dist is None:
+            return None
+        moves = []
+        if st.is_solved(state):
+            successors = [(self.distance(next_state), next_state, move)
+                          for (next_state, move) in st.successors(state)]
+            successors = [successor for successor in successors
+                          if successor[0] is not None]
+            if not successors:
+                return None
+            dist, state, move = min(successors, key=lambda item: item[0])
+            moves.append(move)
+        while dist:
+            for (next_state, move) in st.successors(state):
+                if self.distance(next_state) == dist - 1:
+                    break
+            moves.append(move)
+            state = next_state
+            dist -= 1
+        return moves
+
+    def _find(self, key):
+        """Return the index of the given key in the table, or -1 if it is not
+        in the table."""
+        keys = self._keys
+        low, high = 0, len(self._distances)
+        while low < high:
+            mid = (low + high) >> 1
+            mid_key = keys[2 * mid] | keys[2 * mid + 1] << 64
+            if mid_key < key:
+                low = mid + 1
+            elif mid_key > key:
+                high = mid
+            else:
+                return mid
+        return -1
+
+
+class ClusterStore:
+    """A directory of the distance tables of all clusters built so far.  Each
+    table is stored in a file named <signature>-<n>.rhc, where n distinguishes
+    the different clusters with the same signature.  The store may be shared
+    by several processes."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self._directory = directory
+        self._tables = {}
+
+    def table(self, state, build=True):
+        """Return the distance table of the cluster containing the given
+        state.  If it has not been built yet, build and store it, unless build
+        is False, in which case None is returned."""
+        sig = signature(state)
+        tables = self._load(sig)
+        for table in tables:
+            if state in table:
+                return table
+        if not build:
+            return None
+        table = ClusterTable.build(state)
+        os.makedirs(self._directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self._directory)
+        try:
+            # mkstemp creates the file readable by its owner only; give it
+            # the permissions of an ordinary new file instead
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+            with os.fdopen(fd, "wb") as file:
+                table._write(file)
+            while True:
+                path = self._path(sig, len(tables))
+                try:
+                    os.link(tmp_path, path)
+                    break
+                except FileExistsError:
+                    # Another process stored a table under this name, maybe
+                    # the table of this very cluster
+                    tables.append(ClusterTable.load(path))
+                    if state in tables[-1]:
+                        return tables[-1]
+        finally:
+            os.remove(tmp_path)
+        tables.append(table)
+        return table
+
+    def solve(self, puzzle):
+        """Solve the given puzzle using the distance table of its cluster,
+        building the table first if necessary."""
+        state = st.from_string_rep(puzzle)
+        return self.table(state).solve(state)
+
+    def _load(self, sig):
+        """Return the list of tables with the given signature, loading them
+        from disk if they have not been loaded yet."""
+        if sig not in self._tables:
+            tables = []
+            while os.path.exists(self._path(sig, len(tables))):
+                tables.append(ClusterTable.load(self._path(sig, len(tables))))
+            self._tables[sig] = tables
+        return self._tables[sig]
+
+    def _path(self, sig, number):
+        """Return the path of the numberth table with the given signature."""
+        return os.path.join(self._directory, "{}-{}.rhc".format(sig, number))
+
+
+_stores = {}
+
+
+class ClusterSolver:
+    """A solver that looks the puzzle up in the distance table of its
+    cluster, building the table first if necessary.  Stores are shared by all
+    solvers using the same directory, so tables are loaded only once per
+    process."""
+
+    def __init__(self, string_rep, directory=DEFAULT_DIRECTORY):
+        if directory not in _stores:
+            _stores[directory] = ClusterStore(directory)
+        self._store = _stores[directory]
+        self._start_state = st.from_string_rep(string_rep)
+        self.expanded = 0
+        self.states_seen = 0
+
+    def run(self):
+        """Solve the puzzle using the distance table of its cluster."""
+        table = self._store.table(self._start_state)
+        self.expanded = table.expanded
+        self.states_seen = len(table)
+        table.expanded = 0
+        return table.solve(self._start_state)
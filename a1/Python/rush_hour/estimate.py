@@ -0,0 +1,91 @@
+###############################################################################
+#
+# rush_hour/estimate.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides cheap estimates of the cost of solving a puzzle, used
+to schedule batches of puzzles so the most expensive ones start first.
+
+The cost of a BFS is proportional to the number of states it discovers, so
+the estimate is a number of states.  A BFS never leaves the cluster of its
+start state, so the cluster size recorded in the database is an upper bound.
+Since every puzzle in the database is the hardest state of its cluster, the
+BFS reaches the solved states only after exploring a large part of the
+cluster, and the bound is close to the actual cost for the large clusters
+that matter for scheduling.
+
+Boards that are not in the database are probed instead: a BFS is run with a
+budget of PROBE_STATES discovered states (see rush_hour.solver.run).  If it
+finishes within the budget, the number of states it discovered is the exact
+cost.  Otherwise, the estimate is the number of states discovered times the
+average branching factor of the levels the probe completed, as recorded by
+rush_hour.stats.SearchStats.  This is a crude extrapolation, but clusters
+with many moves per state are also the large ones, so it ranks the puzzles
+that exceed the budget in roughly the right order, and all of them above the
+puzzles that do not."""
+
+
+from rush_hour import solver
+from rush_hour.puzzle_db import DEFAULT_PATH, PuzzleDB
+from rush_hour.stats import SearchStats
+
+
+PROBE_STATES = 1000
+
+
+def from_database(moves, size):
+    """Return the estimated cost of solving a puzzle from the database, given
+    the number of optimal moves and the cluster size recorded for it."""
+    return size if moves else 1
+
+
+def probe(board, max_states=PROBE_STATES):
+    """Return the estimated cost of solving the given puzzle string, obtained
+    by a BFS limited to max_states discovered states."""
+    stats = SearchStats()
+    search = solver.make_solver(board, stats=stats, max_states=max_states)
+    result = search.run()
+    if not isinstance(result, solver.BudgetExceeded):
+        return search.states_seen
+    frontier = sum(level.frontier for level in stats.levels)
+    generated = sum(level.generated for level in stats.levels)
+    return round(search.states_seen * max(1, generated / max(1, frontier)))
+
+
+def estimate(board, database=None):
+    """Return the estimated cost of solving the given puzzle string, using
+    its entry in the given PuzzleDB if it has one and a probe otherwise."""
+    entry = database.lookup(board) if database is not None else None
+    if entry is None or not entry[2]:
+        return probe(board)
+    _, moves, size = entry
+    return from_database(moves, size)
+
+
+def estimate_numbers(numbers, path=DEFAULT_PATH):
+    """Return a dictionary mapping each of the given puzzle numbers to the
+    estimated cost of solving the puzzle in the database at the given path.
+    Numbers without a puzzle have cost 0."""
+    costs = {}
+    with PuzzleDB(path) as database:
+        for number in numbers:
+            try:
+                moves, board, size = database.puzzle(number)
+            except IndexError:
+                costs[number] = 0
+                continue
+            costs[number] = from_database(moves, size) if size else \
+                probe(board)
+    return costs
+
+
+def longest_first(numbers, costs):
+    """Return the given puzzle numbers ordered by decreasing estimated cost,
+    given as a dictionary such as the one returned by estimate_numbers.
+    Puzzles with the same cost keep their order."""
+    return sorted(numbers, key=lambda number: -costs[number])
@@ -0,0 +1,215 @@
+###############################################################################
+#
+# rush_hour/external.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a breadth-first search that keeps its BFS levels on
+disk, so the amount of memory it uses is bounded by a configurable budget no
+matter how large the cluster being searched is.
+
+Every BFS level is stored in a file of packed states (see
+rush_hour.state.pack), each encoded as 16 bytes in big-endian order, sorted
+and without duplicates.  To expand a level, the level file is read
+sequentially and the successors of its states are collected in memory until
+the memory budget is used up.  The collected successors are then sorted and
+written to a run file, and collection starts over.  Once the whole level has
+been expanded, the run files are merged into the file of the next level.
+Every file read during a merge takes a buffer of its own, so the number of
+files merged at once is limited by the budget.  If there are more runs, they
+are first merged in groups into longer runs, in as many passes as needed.
+
+Duplicates are removed during this merge.  Since every move can be undone, a
+successor of a state in level d is either new or belongs to level d - 1 or d,
+so the merge only has to compare the successors against these two level
+files (delayed duplicate detection).
+
+No predecessor links are stored.  Once a solved state is found, the solution
+is reconstructed backwards: for the state at level d on the path, one of its
+successors belongs to level d - 1, which is found by binary search in the
+level file."""
+
+
+import heapq
+import os
+import tempfile
+import rush_hour.state as st
+
+
+DEFAULT_BUDGET = 64 << 20
+
+_RECORD_SIZE = 16
+_BUFFER_SIZE = 1 << 16
+# Approximate number of bytes of memory a buffered key occupies, including
+# its slot in the buffer list
+_KEY_COST = 64
+# Largest number of runs merged at once, to stay clear of the limit on the
+# number of open files
+_MAX_FAN_IN = 128
+
+
+class ExternalSolver:
+    """A BFS that stores its levels in sorted files and keeps at most budget
+    bytes worth of states in memory"""
+
+    def __init__(self, string_rep, budget=DEFAULT_BUDGET, directory=None):
+        self._start_state = st.from_string_rep(string_rep)
+        self._capacity = max(1, budget // _KEY_COST)
+        # Two buffers are needed for the old levels and one for the output
+        self._fan_in = max(2, min(_MAX_FAN_IN, budget // _BUFFER_SIZE - 3))
+        self._directory = directory
+        self._levels = []
+        self.expanded = 0
+        self.states_seen = 0
+        self.runs = 0
+
+    def run(self):
+        """Run the solver from the start state, using a temporary directory
+        for the level and run files."""
+        with tempfile.TemporaryDirectory(dir=self._directory) as directory:
+            self._levels = [os.path.join(directory, "level-0")]
+            _write_keys(self._levels[0], [st.pack(self._start_state)])
+            self.states_seen = 1
+            while True:
+                result = self._expand(directory)
+                if result is not None:
+                    return result
+                if not os.path.getsize(self._levels[-1]):
+                    return None
+
+    def _expand(self, directory):
+        """Expand the last level.  If this finds a solved state, return the
+        solution.  Otherwise, write the next level to a new level file and
+        return None."""
+        depth = len(self._levels) - 1
+        runs = []
+        buffer = []
+        for key in _read_keys(self._levels[-1]):
+            state = st.unpack(key)
+            self.expanded += 1
+            for (next_state, move) in st.successors(state):
+                if st.is_solved(next_state):
+                    return self._path(state, depth) + [move]
+                buffer.append(st.pack(next_state))
+            if len(buffer) >= self._capacity:
+                runs.append(self._spill(directory, buffer))
+                buffer = []
+        if buffer:
+            runs.append(self._spill(directory, buffer))
+        while len(runs) > self._fan_in:
+            runs = [self._merge(directory, runs[start:start + self._fan_in])
+                    for start in range(0, len(runs), self._fan_in)]
+        next_level = os.path.join(directory, "level-{}".format(depth + 1))
+        old_levels = [_read_keys(path) for path in self._levels[-2:]]
+        new_keys = _difference(_unique(heapq.merge(
+            *(_read_keys(run) for run in runs))), heapq.merge(*old_levels))
+        self.states_seen += _write_keys(next_level, new_keys)
+        for run in runs:
+            os.remove(run)
+        self._levels.append(next_level)
+        return None
+
+    def _spill(self, directory, buffer):
+        """Sort the given successors and write them to a new run file."""
+        buffer.sort()
+        path = os.path.join(directory, "run-{}".format(self.runs))
+        self.runs += 1
+        _write_keys(path, _unique(buffer))
+        return path
+
+    def _merge(self, directory, runs):
+        """Merge the given run files into a new run file and delete them."""
+        if len(runs) == 1:
+            return runs[0]
+        path = os.path.join(directory, "run-{}".format(self.runs))
+        self.runs += 1
+        _write_keys(path, _unique(heapq.merge(
+            *(_read_keys(run) for run in runs))))
+        for run in runs:
+            os.remove(run)
+        return path
+
+    def _path(self, state, depth):
+        """Reconstruct the sequence of moves that leads from the start state to
+        the given state at the given BFS level."""
+        moves = []
+        while depth:
+            depth -= 1
+            for (prev_state, move) in st.successors(state):
+                if _contains(self._levels[depth], st.pack(prev_state)):
+                    break
+            moves.append(st.reverse_move(state, move))
+            state = prev_state
+        moves.reverse()
+        return moves
+
+
+def _write_keys(path, keys):
+    """Write the given sorted keys to the given file and return their
+    number."""
+    count = 0
+    with open(path, "wb") as file:
+        chunk = bytearray()
+        for key in keys:
+            chunk += key.to_bytes(_RECORD_SIZE, "big")
+            count += 1
+            if len(chunk) >= _BUFFER_SIZE:
+                file.write(chunk)
+                chunk = bytearray()
+        file.write(chunk)
+    return count
+
+
+def _read_keys(path):
+    """Iterate over the keys stored in the given file."""
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(_BUFFER_SIZE)
+            if not chunk:
+                return
+            for offset in range(0, len(chunk), _RECORD_SIZE):
+                yield int.from_bytes(chunk[offset:offset + _RECORD_SIZE],
+                                     "big")
+
+
+def _unique(keys):
+    """Drop repeated keys from a sorted sequence of keys."""
+    last = None
+    for key in keys:
+        if key != last:
+            yield key
+            last = key
+
+
+def _difference(keys, excluded):
+    """Return the keys in the sorted sequence keys that do not occur in the
+    sorted sequence excluded."""
+    excluded = iter(excluded)
+    next_excluded = next(excluded, None)
+    for key in keys:
+        while next_excluded is not None and next_excluded < key:
+            next_excluded = next(excluded, None)
+        if key != next_excluded:
+            yield key
+
+
+def _contains(path, key):
+    """Check whether the given key occurs in the given sorted key file, using
+    binary search."""
+    with open(path, "rb") as file:
+        low, high = 0, os.path.getsize(path) // _RECORD_SIZE
+        while low < high:
+            mid = (low + high) >> 1
+            file.seek(mid * _RECORD_SIZE)
+            mid_key = int.from_bytes(file.read(_RECORD_SIZE), "big")
+            if mid_key < key:
+                low = mid + 1
+            elif mid_key > key:
+                high = mid
+            else:
+                return True
+    return False
@@ -0,0 +1,214 @@
+###############################################################################
+#
+# rush_hour/generate.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the logic to generate the puzzle database from
+scratch.
+
+Every puzzle in the database is the hardest state of a cluster that contains
+a solved state.  Pieces never leave their rows or columns, and pieces in the
+same row or column never pass each other, so all states of a cluster have the
+same layout: the same sequence of piece lengths in every row and column (see
+rush_hour.cluster.signature).  The generator enumerates all layouts with the
+red car, a car of length 2, as the only horizontal piece in the third row.
+For every layout, it enumerates the solved states with this layout and splits
+them into clusters by exploring the cluster of every solved state not found
+in an earlier cluster.  A BFS from all solved states of the cluster at once
+(see rush_hour.cluster.solve_distances) finds the hardest states of the
+cluster.  The lexicographically smallest of their string representations is
+recorded, together with the number of moves needed to solve it and the size
+of the cluster, as in the published database.  Clusters whose states are all
+solved are not puzzles and are skipped.
+
+Layouts are generated in units of work, one per sequence of horizontal piece
+lengths in the rows.  Each unit enumerates the sequences of vertical piece
+lengths in the columns that admit a solved state, pruning every partial
+sequence that does not, and writes its puzzles to a file of its own in a
+checkpoint directory as soon as it is done.  Units are run in a pool of
+worker processes; an interrupted run resumes with the units whose files are
+missing.  Once all units are done, merge combines their files into a text
+database, sorted by decreasing number of moves and cluster size, and builds
+its index (see rush_hour.puzzle_db.build_index).
+
+The complete database is the result of generating with no limit on the
+number of pieces; limiting the number of pieces produces the part of the
+database with at most this many pieces, including the red car."""
+
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+import os
+import rush_hour.state as st
+from rush_hour.cluster import explore, solve_distances
+from rush_hour.puzzle_db import build_index
+
+
+DEFAULT_DIRECTORY = "../generate"
+
+# The sequences of piece lengths that fit into a row or column
+LINE_PIECES = ((), (2,), (3,), (2, 2), (2, 3), (3, 2), (3, 3), (2, 2, 2))
+RED_ROW = 3
+
+_PARAMETERS = "parameters"
+
+
+def units(max_pieces=None):
+    """Return the list of units of work for layouts with at most max_pieces
+    pieces (no limit if max_pieces is None).  A unit is a tuple of the
+    sequences of horizontal piece lengths in rows 1 to 6, other than the red
+    car."""
+    result = []
+    for rows in product(LINE_PIECES, repeat=5):
+        rows = rows[:RED_ROW - 1] + ((),) + rows[RED_ROW - 1:]
+        if max_pieces is None or \
+                1 + sum(len(row) for row in rows) <= max_pieces:
+            result.append(rows)
+    return result
+
+
+def unit_name(rows):
+    """Return the name of the checkpoint file of the given unit."""
+    return "-".join("".join(map(str, row)) or "0" for row in rows) + ".txt"
+
+
+def generate_unit(rows, max_pieces=None):
+    """Generate the puzzles of all layouts with the given rows and at most
+    max_pieces pieces.  This is an iterator that yields the puzzles as triples
+    consisting of the number of optimal moves, the puzzle string, and the
+    cluster size."""
+    lines = {}
+    for (row, lengths) in enumerate(rows, 1):
+        members = [(length, False) for length in lengths]
+        if row == RED_ROW:
+            members.append((2, True))
+        if members:
+            lines[(True, row)] = members
+    budget = None if max_pieces is None else \
+        max_pieces - sum(len(members) for members in lines.values())
+    for layout in _layouts(lines, 1, budget):
+        yield from _cluster_puzzles(layout)
+
+
+def _layouts(lines, column, budget):
+    """Extend the given lines, which have pieces in the rows and in the
+    columns before the given column, by the pieces of the remaining columns,
+    with at most budget more pieces (no limit if budget is None).  Generate
+    the resulting lines that admit a solved state."""
+    if column > 6:
+        yield lines
+        return
+    for lengths in LINE_PIECES:
+        if budget is not None and len(lengths) > budget:
+            continue
+        extended = dict(lines)
+        if lengths:
+            extended[(False, column)] = [(length, False)
+                                         for length in lengths]
+            if next(st.solved_layouts(extended), None) is None:
+                continue
+        yield from _layouts(extended, column + 1,
+                            None if budget is None else budget - len(lengths))
+
+
+def _cluster_puzzles(lines):
+    """Generate the puzzles of all clusters with the given layout that
+    contain a solved state and an unsolved one."""
+    done = set()
+    for state in st.solved_layouts(lines):
+        if st.pack(state) in done:
+            continue
+        seen = explore(state)
+        distances, _ = solve_distances(seen)
+        moves = max(distances)
+        hardest = []
+        for (index, dist) in enumerate(distances):
+            if dist == 0:
+                done.add(seen.key(index))
+            elif dist == moves:
+                hardest.append(st.to_string_rep(st.unpack(seen.key(index))))
+        if moves:
+            yield moves, min(hardest), len(seen)
+
+
+def run_unit(directory, rows, max_pieces=None):
+    """Generate the puzzles of the given unit and write them to its
+    checkpoint file in the given directory.  Return the unit and the number
+    of puzzles."""
+    path = os.path.join(directory, unit_name(rows))
+    count = 0
+    with open(path + ".tmp", "w") as file:
+        for (moves, board, size) in generate_unit(rows, max_pieces):
+            file.write("{} {} {}\n".format(moves, board, size))
+            count += 1
+    os.replace(path + ".tmp", path)
+    return rows, count
+
+
+def generate(directory=DEFAULT_DIRECTORY, max_pieces=None, jobs=None):
+    """Run all units not checkpointed in the given directory yet in a pool of
+    jobs worker processes (one per core by default).  This is an iterator
+    that yields the unit and the number of its puzzles as each unit finishes,
+    in no particular order.  Raise ValueError if the directory holds
+    checkpoints of a run with a different limit on the number of pieces."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, _PARAMETERS)
+    if not os.path.exists(path):
+        with open(path, "w") as file:
+            file.write("max_pieces {}\n".format(max_pieces))
+    elif parameters(directory) != max_pieces:
+        raise ValueError("{} holds checkpoints of a run with a different "
+                         "number of pieces".format(directory))
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        futures = [executor.submit(run_unit, directory, rows, max_pieces)
+                   for rows in pending_units(directory, max_pieces)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def parameters(directory=DEFAULT_DIRECTORY):
+    """Return the limit on the number of pieces of the run checkpointed in
+    the given directory.  Raise ValueError if there is no such run."""
+    try:
+        with open(os.path.join(directory, _PARAMETERS), "r") as file:
+            _, value = file.read().split()
+    except (OSError, ValueError):
+        raise ValueError("{} holds no checkpoints".format(directory)) \
+            from None
+    return None if value == "None" else int(value)
+
+
+def pending_units(directory=DEFAULT_DIRECTORY, max_pieces=None):
+    """Return the list of units not checkpointed in the given directory."""
+    return [rows for rows in units(max_pieces) if not os.path.exists(
+        os.path.join(directory, unit_name(rows)))]
+
+
+def merge(directory, path):
+    """Merge the checkpoint files of all units in the given directory into a
+    text database at the given path and build its index.  Return the number
+    of puzzles.  Raise ValueError if a unit has not been generated yet."""
+    puzzles = []
+    for rows in units(parameters(directory)):
+        unit_path = os.path.join(directory, unit_name(rows))
+        if not os.path.exists(unit_path):
+            raise ValueError("Unit {} has not been generated".format(
+                unit_name(rows)))
+        with open(unit_path, "r") as file:
+            for line in file:
+                moves, board, size = line.split()
+                puzzles.append((int(moves), int(size), board))
+    puzzles.sort(reverse=True)
+    with open(path + ".tmp", "w") as file:
+        for (moves, size, board) in puzzles:
+            file.write("{} {} {}\n".format(moves, board, size))
+    os.replace(path + ".tmp", path)
+    return build_index(path)
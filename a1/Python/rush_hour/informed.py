@@ -0,0 +1,275 @@
+###############################################################################
+#
+# rush_hour/informed.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides informed search strategies for solving a Rush Hour
+puzzle: A* and IDA*.  Both are guided by an admissible heuristic, that is, a
+lower bound on the number of moves needed to reach a solved state, so the
+solutions they find are optimal.
+
+The heuristics are functions that map a state to such a lower bound:
+
+- blockers:   1 for moving the red car plus 1 for every piece blocking its
+              path to the exit
+- blockers2:  the same, plus 1 for every blocking piece that cannot clear the
+              red car's row without another piece moving out of its way first
+              (counting only blocking pieces that depend on disjoint sets of
+              other pieces, so no move is counted twice)
+- pattern:    the larger of blockers2 and the sum of two bounds on disjoint
+              sets of moves: the pattern database bound of rush_hour.pattern
+              on the moves of the red car and of all vertical pieces in
+              columns 3 to 6, the columns the red car has to pass through,
+              and the smallest number of horizontal pieces other than the red
+              car that have to move out of the way of the red car's blockers
+
+The red car is the rightmost horizontal piece in the third row, since this is
+the piece that has to reach the exit for is_solved to hold."""
+
+
+from array import array
+from heapq import heappop, heappush
+from itertools import product
+import rush_hour.state as st
+from rush_hour import pattern as pattern_db
+from rush_hour.table import StateTable
+
+
+_RED_ROW = 0x000000007e000000
+_EXIT = 30
+
+
+def blockers(state):
+    """Return 1 plus the number of pieces between the red car and the exit, or
+    0 if the board is solved."""
+    path = _red_path(state)
+    if path is None:
+        return 0
+    return 1 + (state[2] & path).bit_count()
+
+
+def blockers2(state):
+    """Return the blockers heuristic plus the number of blocking pieces that
+    need another piece to move before they can clear the red car's row."""
+    path = _red_path(state)
+    if path is None:
+        return 0
+    estimate = 1
+    used = set()
+    blocking = state[2] & path
+    while blocking:
+        pos = blocking.bit_length() - 1
+        blocking ^= 1 << pos
+        estimate += 1
+        helpers = _helpers(state, pos)
+        if helpers and not helpers & used:
+            estimate += 1
+            used |= helpers
+    return estimate
+
+
+def pattern(state):
+    """Return the larger of blockers2 and the pattern database bound plus the
+    number of horizontal pieces that have to move, or infinity if the pattern
+    database shows that the state cannot be solved.  The pattern database
+    counts only moves of the red car and of the vertical pieces in columns 3
+    to 6, whether or not they block the red car, and the other bound counts
+    only moves of other horizontal pieces, so the two bounds can be added."""
+    path = _red_path(state)
+    if path is None:
+        return 0
+    bound = pattern_db.table().bound(state)
+    if bound is None:
+        return float("inf")
+    return max(blockers2(state), bound + _horizontal_moves(state, path))
+
+
+def _horizontal_moves(state, path):
+    """Return the smallest number of horizontal pieces that have to move so
+    that every blocking piece on the given path of the red car can leave the
+    red car's row in one of the directions available to it.  Every horizontal
+    piece occupying a cell a blocking piece has to pass through in the
+    direction it takes has to move at least once."""
+    choices = []
+    blocking = state[2] & path
+    while blocking:
+        pos = blocking.bit_length() - 1
+        blocking ^= 1 << pos
+        choices.append([{_piece_end(state, cell) for cell in cells
+                         if st.is_horizontal(state, cell)}
+                        for cells in _escape_paths(state, pos)])
+    return min(len(set().union(*choice)) for choice in product(*choices))
+
+
+def _red_path(state):
+    """Return the mask of cells between the red car and the exit, or None if
+    the board is solved or there is no red car."""
+    if st.is_solved(state):
+        return None
+    red_ends = state[1] & state[3] & _RED_ROW
+    if not red_ends:
+        return None
+    red_end = red_ends.bit_length() - 1
+    return ((1 << (_EXIT + 1)) - 1) ^ ((1 << (red_end + 1)) - 1)
+
+
+def _helpers(state, pos):
+    """Given the position of a vertical piece that crosses the red car's row,
+    return the set of pieces (identified by their end cells) one of which has
+    to move before this piece can leave the row.  The set is empty if the
+    piece can leave the row without help."""
+    helpers = set()
+    for cells in _escape_paths(state, pos):
+        cells = [cell for cell in cells if st.is_occupied(state, cell)]
+        if not cells:
+            return set()
+        helpers.update(_piece_end(state, cell) for cell in cells)
+    return helpers
+
+
+def _escape_paths(state, pos):
+    """Given the position of a vertical piece that crosses the red car's row,
+    return the lists of cells the piece has to pass through to leave the row,
+    one list for each direction in which it fits on the board."""
+    top = bottom = pos
+    while st.is_vertical(state, top - 8) and not st.is_end(state, top - 8):
+        top -= 8
+    while not st.is_end(state, bottom):
+        bottom += 8
+    paths = []
+    # Moving up, the bottom cell has to end up in row 2.  Moving down, the top
+    # cell has to end up in row 4.
+    for first, last in ((top - 8 * ((bottom >> 3) - 2), top - 8),
+                        (bottom + 8, bottom + 8 * (4 - (top >> 3)))):
+        if first >= 8 and last <= 55:
+            paths.append(range(first, last + 1, 8))
+    return paths
+
+
+def _piece_end(state, pos):
+    """Return the end cell of the piece occupying position pos."""
+    step = 1 if st.is_horizontal(state, pos) else 8
+    while not st.is_end(state, pos):
+        pos += step
+    return pos
+
+
+HEURISTICS = {
+    "blockers": blockers,
+    "blockers2": blockers2,
+    "pattern": pattern,
+}
+
+
+class AStarSolver:
+    """An A* search of the state space.  Since the heuristics are admissible
+    but not necessarily consistent, a state whose distance from the start
+    state improves after it has been expanded is expanded again."""
+
+    def __init__(self, string_rep, heuristic="blockers2"):
+        self._heuristic = HEURISTICS[heuristic]
+        start_state = st.from_string_rep(string_rep)
+        self._seen = StateTable()
+        self._seen.add(st.pack(start_state))
+        self._dist = array("i", [0])
+        self._queue = [(self._heuristic(start_state), 0, 0)]
+        self.expanded = 0
+
+    @property
+    def states_seen(self):
+        """The number of distinct states discovered so far."""
+        return len(self._seen)
+
+    def run(self):
+        """Run the solver from the start state.  Queue entries are ordered by
+        estimated solution length, breaking ties in favour of states farther
+        from the start.  Entries whose distance has since improved are
+        skipped."""
+        seen, dist, queue = self._seen, self._dist, self._queue
+        heuristic = self._heuristic
+        while queue:
+            _, neg_dist, index = heappop(queue)
+            if -neg_dist > dist[index]:
+                continue
+            state = st.unpack(seen.key(index))
+            if neg_dist and st.is_solved(state):
+                return seen.path(index)
+            self.expanded += 1
+            next_dist = 1 - neg_dist
+            for (next_state, move) in st.successors(state):
+                key = st.pack(next_state)
+                next_index = seen.index(key)
+                if next_index < 0:
+                    next_index = seen.add(key, index, move)
+                    dist.append(next_dist)
+                elif next_dist < dist[next_index]:
+                    seen.relink(next_index, index, move)
+                    dist[next_index] = next_dist
+                else:
+                    continue
+                heappush(queue, (next_dist + heuristic(next_state),
+                                 -next_dist, next_index))
+        return None
+
+
+class IDAStarSolver:
+    """An IDA* search of the state space.  Each iteration is a depth-first
+    search that prunes every path whose estimated length exceeds the current
+    bound.  To keep the search from exploring the same state over and over
+    along different paths, each iteration remembers the shortest distance from
+    the start state at which it has reached every state and prunes paths that
+    reach a state again without improving on this distance."""
+
+    def __init__(self, string_rep, heuristic="blockers2"):
+        self._heuristic = HEURISTICS[heuristic]
+        self._start_state = st.from_string_rep(string_rep)
+        self._reached = {}
+        self._path = []
+        self.expanded = 0
+
+    @property
+    def states_seen(self):
+        """The number of distinct states reached by the current iteration."""
+        return len(self._reached)
+
+    def run(self):
+        """Run the solver from the start state, raising the bound to the
+        smallest pruned estimate after every unsuccessful iteration."""
+        bound = self._heuristic(self._start_state)
+        while True:
+            self._reached = {}
+            bound = self._search(self._start_state, 0, bound)
+            if bound is None:
+                return self._path
+            if bound == float("inf"):
+                return None
+
+    def _search(self, state, dist, bound):
+        """Search for a solution of length at most bound that extends the
+        current path, which leads to state using dist moves.  Return None if
+        one is found, leaving the solution in self._path.  Otherwise, return
+        the smallest estimated solution length that exceeded the bound."""
+        estimate = dist + self._heuristic(state)
+        if estimate > bound:
+            return estimate
+        if dist and st.is_solved(state):
+            return None
+        key = st.pack(state)
+        if self._reached.get(key, dist + 1) <= dist:
+            return float("inf")
+        self._reached[key] = dist
+        self.expanded += 1
+        smallest = float("inf")
+        for (next_state, move) in st.successors(state):
+            self._path.append(move)
+            result = self._search(next_state, dist + 1, bound)
+            if result is None:
+                return None
+            self._path.pop()
+            smallest = min(smallest, result)
+        return smallest
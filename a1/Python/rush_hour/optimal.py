@@ -0,0 +1,145 @@
+###############################################################################
+#
+# rush_hour/optimal.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the logic to count and enumerate all optimal
+solutions of a puzzle.
+
+A BFS from the start state is run until it reaches the first level that
+contains a solved state.  Unlike the BFS of rush_hour.solver, it completes
+this level.  Every optimal solution is a path that visits one state of each
+level, from the start state to a solved state in the last level.  Since no
+two moves from the same state lead to the same state, different paths are
+different solutions.
+
+The number of optimal solutions is computed by dynamic programming over the
+levels, from the last level back to the start state: the number of optimal
+continuations from a state in the last level is 1 if it is solved and 0
+otherwise, and the number of optimal continuations from a state in an earlier
+level is the sum of the numbers of its successors in the next level.  The
+number of optimal solutions is the number of optimal continuations from the
+start state.  These numbers also let the enumeration of solutions skip every
+state that does not lie on an optimal solution, so the solutions can be
+generated one at a time by a depth-first search that never backtracks out of
+a dead end.
+
+Only the states of the levels and their counts are stored; neither the edges
+between levels nor any solutions are, so the memory needed does not depend on
+the number of solutions, which can be exponential in their length."""
+
+
+import rush_hour.state as st
+from rush_hour.table import StateTable
+
+
+class OptimalSolutions:
+    """The optimal solutions of a puzzle"""
+
+    def __init__(self, string_rep):
+        self._seen = StateTable()
+        self._seen.add(st.pack(st.from_string_rep(string_rep)))
+        self._levels = [0, 1]
+        self._counts = None
+        self.expanded = 0
+
+    @property
+    def states_seen(self):
+        """The number of distinct states discovered so far."""
+        return len(self._seen)
+
+    @property
+    def length(self):
+        """The number of moves of an optimal solution, or None if the puzzle
+        is unsolvable."""
+        self._count()
+        return len(self._levels) - 2 if self._counts[0] else None
+
+    def count(self):
+        """Return the number of optimal solutions."""
+        self._count()
+        return self._counts[0]
+
+    def __iter__(self):
+        """Generate the optimal solutions one at a time, each as a list of
+        moves."""
+        self._count()
+        if not self._counts[0]:
+            return
+        length = len(self._levels) - 2
+        path = []
+        stack = [self._continuations(0, 0)]
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                stack.pop()
+                if path:
+                    path.pop()
+                continue
+            index, move = step
+            path.append(move)
+            if len(path) == length:
+                yield list(path)
+                path.pop()
+            else:
+                stack.append(self._continuations(index, len(path)))
+
+    def _continuations(self, index, depth):
+        """Generate the successors of the state with the given index at the
+        given depth that lie on optimal solutions, as (index, move) pairs."""
+        for (next_index, move) in self._next_level(index, depth):
+            if self._counts[next_index]:
+                yield next_index, move
+
+    def _next_level(self, index, depth):
+        """Generate the successors of the state with the given index at the
+        given depth that belong to the next level, as (index, move) pairs."""
+        seen = self._seen
+        low, high = self._levels[depth + 1], self._levels[depth + 2]
+        for (next_state, move) in st.successors(st.unpack(seen.key(index))):
+            next_index = seen.index(st.pack(next_state))
+            if low <= next_index < high:
+                yield next_index, move
+
+    def _count(self):
+        """Run the BFS and count the optimal continuations from every state,
+        unless this has been done already."""
+        if self._counts is not None:
+            return
+        if not self._search():
+            self._counts = [0]
+            return
+        levels = self._levels
+        depth = len(levels) - 2
+        counts = [0] * levels[-1]
+        for index in range(levels[depth], levels[depth + 1]):
+            if st.is_solved(st.unpack(self._seen.key(index))):
+                counts[index] = 1
+        for depth in range(depth - 1, -1, -1):
+            for index in range(levels[depth], levels[depth + 1]):
+                counts[index] = sum(counts[next_index] for (next_index, _) in
+                                    self._next_level(index, depth))
+        self._counts = counts
+
+    def _search(self):
+        """Add BFS levels to the visited table until a level contains a solved
+        state.  Return False if the puzzle turns out to be unsolvable."""
+        seen, levels = self._seen, self._levels
+        while levels[-2] < levels[-1]:
+            solved = False
+            for index in range(levels[-2], levels[-1]):
+                self.expanded += 1
+                for (next_state, move) in st.successors(
+                        st.unpack(seen.key(index))):
+                    if seen.add(st.pack(next_state), index, move) >= 0 and \
+                            st.is_solved(next_state):
+                        solved = True
+            levels.append(len(seen))
+            if solved:
+                return True
+        return False
@@ -0,0 +1,227 @@
+###############################################################################
+#
+# rush_hour/parallel.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a breadth-first search that expands each BFS level
+using several worker processes.
+
+The state space is split into partitions by a hash of the packed state (see
+rush_hour.state.pack), one partition per worker.  Each worker owns the
+visited table of its partition and expands the states of the current level
+that belong to its partition.  The successors it generates are sorted by the
+partition they belong to and handed to the workers owning these partitions,
+which add the new ones to their visited tables.  These become the next level.
+
+Successors are exchanged in batches through shared memory: for every
+partition it sends successors to, a worker writes them into a shared memory
+block consisting of an array of keys (two 64-bit words per state), an array
+of the global indices of the states they were reached from, and an array of
+the moves that reached them.  Only the names and sizes of these blocks are
+sent through the pipes connecting the workers to the coordinating process.
+The global index of a state is its index in the visited table of its
+partition times the number of workers plus the number of its partition.
+
+The coordinating process steps the workers through the levels, so each level
+is expanded completely before the next one is.  As soon as a level contains a
+solved state, the path to this state is optimal.  It is reconstructed by
+asking the workers for the predecessor links of the states on this path."""
+
+
+from array import array
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+import os
+import rush_hour.state as st
+from rush_hour.table import StateTable
+
+
+_WORD_MASK = 0xffffffffffffffff
+_HASH_MULTIPLIER = 0x9e3779b97f4a7c15
+_SOLVED_BIT = 1 << 30
+
+
+def partition(key, workers):
+    """Return the partition the state with the given key belongs to."""
+    mixed = ((key ^ key >> 64) * _HASH_MULTIPLIER) & _WORD_MASK
+    return (mixed >> 32) % workers
+
+
+class ParallelSolver:
+    """A level-synchronous BFS whose levels are expanded by a pool of worker
+    processes, one per core by default"""
+
+    def __init__(self, string_rep, workers=None):
+        self._start_key = st.pack(st.from_string_rep(string_rep))
+        self._workers = workers or os.cpu_count() or 1
+        self.expanded = 0
+        self.states_seen = 1
+
+    def run(self):
+        """Start the workers, run the solver from the start state, and shut
+        the workers down again."""
+        context = multiprocessing.get_context()
+        # Start the resource tracker before starting the workers, so they all
+        # share it and it sees each shared memory block created, attached to,
+        # and unlinked by different workers
+        resource_tracker.ensure_running()
+        conns, processes = [], []
+        try:
+            for number in range(self._workers):
+                conn, worker_conn = context.Pipe()
+                process = context.Process(
+                    target=_work, daemon=True,
+                    args=(worker_conn, number, self._workers,
+                          self._start_key))
+                process.start()
+                worker_conn.close()
+                conns.append(conn)
+                processes.append(process)
+            return self._search(conns)
+        finally:
+            for conn in conns:
+                try:
+                    conn.send(("stop",))
+                except OSError:
+                    pass
+            for process in processes:
+                process.join()
+
+    def _search(self, conns):
+        """Step the workers connected through the given pipes through the BFS
+        levels until one of them finds a solved state."""
+        frontier = 1
+        while frontier:
+            self.expanded += frontier
+            for conn in conns:
+                conn.send(("expand",))
+            incoming = [[] for _ in conns]
+            for conn in conns:
+                for (number, name, count) in conn.recv():
+                    incoming[number].append((name, count))
+            for (conn, batches) in zip(conns, incoming):
+                conn.send(("insert", batches))
+            frontier, solved = 0, -1
+            for conn in conns:
+                added, found = conn.recv()
+                frontier += added
+                if solved < 0:
+                    solved = found
+            self.states_seen += frontier
+            if solved >= 0:
+                return self._path(conns, solved)
+        return None
+
+    def _path(self, conns, index):
+        """Reconstruct the sequence of moves that leads from the start state to
+        the state with the given global index."""
+        moves = []
+        while True:
+            conn = conns[index % len(conns)]
+            conn.send(("link", index // len(conns)))
+            index, move = conn.recv()
+            if index < 0:
+                break
+            moves.append(move)
+        moves.reverse()
+        return moves
+
+
+def _work(conn, number, workers, start_key):
+    """The main loop of the worker owning the given partition.  It answers
+    the commands sent by ParallelSolver through the given pipe until it is told
+    to stop."""
+    seen = StateTable()
+    if partition(start_key, workers) == number:
+        seen.add(start_key)
+    start, end = 0, len(seen)
+    sent = []
+    while True:
+        command = conn.recv()
+        if command[0] in ("expand", "stop"):
+            # All other workers have read the batches sent at the last level
+            for block in sent:
+                block.close()
+                block.unlink()
+            sent = []
+        if command[0] == "stop":
+            return
+        if command[0] == "expand":
+            batches = _expand(seen, start, end, number, workers)
+            reply = []
+            for (target, batch) in enumerate(batches):
+                if batch[2]:
+                    block = _write_batch(batch)
+                    sent.append(block)
+                    reply.append((target, block.name, len(batch[2])))
+            conn.send(reply)
+        elif command[0] == "insert":
+            solved = -1
+            for (name, count) in command[1]:
+                found = _insert_batch(seen, name, count, number, workers)
+                if solved < 0:
+                    solved = found
+            start, end = end, len(seen)
+            conn.send((end - start, solved))
+        elif command[0] == "link":
+            index = command[1]
+            conn.send((seen.parent(index), seen.move(index)))
+
+
+def _expand(seen, start, end, number, workers):
+    """Generate the successors of the states with indices start to end - 1 in
+    the visited table of the given partition.  Return one batch per partition,
+    each consisting of an array of keys, an array of global parent indices,
+    and an array of moves."""
+    batches = [(array("Q"), array("i"), array("H")) for _ in range(workers)]
+    for index in range(start, end):
+        parent = index * workers + number
+        for (next_state, move) in st.successors(st.unpack(seen.key(index))):
+            key = st.pack(next_state)
+            keys, parents, moves = batches[partition(key, workers)]
+            keys.append(key & _WORD_MASK)
+            keys.append(key >> 64)
+            parents.append(parent)
+            moves.append(move)
+    return batches
+
+
+def _write_batch(batch):
+    """Copy the given batch into a new shared memory block and return the
+    block."""
+    parts = [memoryview(part).cast("B") for part in batch]
+    block = shared_memory.SharedMemory(create=True,
+                                       size=sum(len(part) for part in parts))
+    offset = 0
+    for part in parts:
+        block.buf[offset:offset + len(part)] = part
+        offset += len(part)
+    return block
+
+
+def _insert_batch(seen, name, count, number, workers):
+    """Add the states in the batch of count states stored in the shared memory
+    block with the given name to the visited table of the given partition.
+    Return the global index of a solved state among the new states, or -1 if
+    there is none."""
+    block = shared_memory.SharedMemory(name=name)
+    keys, parents, moves = array("Q"), array("i"), array("H")
+    offset = 0
+    for part in (keys, parents, moves):
+        size = part.itemsize * count * (2 if part is keys else 1)
+        part.frombytes(block.buf[offset:offset + size])
+        offset += size
+    block.close()
+    solved = -1
+    for i in range(count):
+        low = keys[2 * i]
+        index = seen.add(low | keys[2 * i + 1] << 64, parents[i], moves[i])
+        if index >= 0 and solved < 0 and low & _SOLVED_BIT and \
+                st.is_solved(st.unpack(seen.key(index))):
+            solved = index * workers + number
+    return solved
@@ -0,0 +1,212 @@
+###############################################################################
+#
+# rush_hour/pattern.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a pattern database: a precomputed table of lower
+bounds on the number of moves needed to solve a state.
+
+The bounds are exact solution lengths of an abstracted puzzle that keeps only
+the red car and the vertical pieces in columns 3 to 6, the columns the red
+car has to pass through on its way to the exit whenever it is not yet solved.
+All other pieces are removed.  Removing pieces only removes obstacles, so
+every solution of a state is still a solution of its abstraction once the
+moves of removed pieces are dropped, and the abstraction's solution length is
+a lower bound on the state's.  Unlike the blockers heuristics, the bound
+accounts for the vertical pieces that block the red car's blockers, for chains
+of such pieces, and for the red car itself blocking pieces in the columns it
+occupies.  If the abstraction cannot be solved, neither can the state.
+
+An abstract state is given by the position of the red car and the arrangement
+of vertical pieces in each of the 4 columns.  There are only
+COLUMN_ARRANGEMENTS = 24 ways to arrange pieces in a column, so the table has
+5 * 24**4 entries, one per abstract state, indexed by the red car's position
+followed by the arrangements of columns 3 to 6 in base 24.  The entries are
+computed by a BFS from all solved abstract states at once; the abstract states
+are ordinary states that happen to have few pieces, so the BFS uses the move
+generator of rush_hour.state.  Abstract states that cannot be solved, and
+indices of overlapping pieces, have entry UNSOLVABLE.  No abstract state needs
+more than a handful of moves, so every entry fits into 4 bits, and the table
+stores two entries per byte, the even entry in the low half.
+
+On disk, the table is preceded by a 16-byte header consisting of the magic
+bytes RHPD, the format version, the number of entries, and the number of
+moves of the hardest abstract state, all stored as 32-bit little-endian
+words.  The table is built and stored the first time it is needed, and
+memory-mapped after that.  Looking up a state takes a constant number of
+word operations: the red car's position and the arrangement of each column
+are read off the state's bit vectors."""
+
+
+import mmap
+import os
+import struct
+import rush_hour.state as st
+
+
+DEFAULT_PATH = "../pattern.rhp"
+UNSOLVABLE = 15
+
+COLUMNS = (3, 4, 5, 6)
+
+_MAGIC = b"RHPD"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+_RED_ROW = 0x000000007e000000
+_COLUMN = 0x0101010101010101
+_GATHER_COLUMN = 0x0102040810204080
+
+
+def _arrangements():
+    """List the arrangements of vertical pieces in a column as pairs of bit
+    vectors (cells, ends) of the pieces in column 0, rows 1 to 6."""
+    result = []
+
+    def place(row, cells, ends):
+        if row > 6:
+            result.append((cells, ends))
+            return
+        place(row + 1, cells, ends)
+        for length in (2, 3):
+            if row + length <= 7:
+                piece = sum(1 << (8 * r) for r in range(row, row + length))
+                place(row + length, cells | piece,
+                      ends | 1 << (8 * (row + length - 1)))
+
+    place(1, 0, 0)
+    return result
+
+
+def _column_key(cells, ends, column):
+    """Return the 12-bit key of the arrangement of the pieces in the given
+    column of the given bit vectors of cells and end cells of vertical
+    pieces."""
+    return ((((cells >> column) & _COLUMN) * _GATHER_COLUMN >> 57) & 0x3f |
+            (((ends >> column) & _COLUMN) * _GATHER_COLUMN >> 51) & 0xfc0)
+
+
+_ARRANGEMENTS = _arrangements()
+COLUMN_ARRANGEMENTS = len(_ARRANGEMENTS)
+_ARRANGEMENT_INDEX = [0] * 4096
+for (_number, (_cells, _ends)) in enumerate(_ARRANGEMENTS):
+    _ARRANGEMENT_INDEX[_column_key(_cells, _ends, 0)] = _number
+TABLE_SIZE = 5 * COLUMN_ARRANGEMENTS ** len(COLUMNS)
+
+
+def index(state):
+    """Return the index of the abstraction of the given unsolved state in the
+    pattern database.  The red car is the rightmost horizontal piece in the
+    third row."""
+    vert = state[2]
+    ends = state[3] & vert
+    result = (((state[1] & state[3] & _RED_ROW).bit_length() - 1) & 7) - 2
+    for column in COLUMNS:
+        result = result * COLUMN_ARRANGEMENTS + \
+            _ARRANGEMENT_INDEX[_column_key(vert, ends, column)]
+    return result
+
+
+def abstract_state(number):
+    """Return the abstract state with the given index, or None if the index
+    describes overlapping pieces."""
+    red = number // COLUMN_ARRANGEMENTS ** len(COLUMNS)
+    horiz = 3 << (25 + red)
+    vert = 0
+    ends = 1 << (26 + red)
+    for column in reversed(COLUMNS):
+        number, arrangement = divmod(number, COLUMN_ARRANGEMENTS)
+        cells, piece_ends = _ARRANGEMENTS[arrangement]
+        vert |= cells << column
+        ends |= piece_ends << column
+    if horiz & vert:
+        return None
+    horiz |= st.HORIZ_BORDER
+    vert |= st.VERT_BORDER
+    return (horiz | vert, horiz, vert, ends)
+
+
+class PatternTable:
+    """The pattern database"""
+
+    def __init__(self, entries, moves):
+        """Construct a table from the given array of packed entries.  moves is
+        the largest distance of a solvable abstract state."""
+        self._entries = entries
+        self._map = None
+        self.moves = moves
+
+    @classmethod
+    def build(cls):
+        """Build the table by a BFS from all solved abstract states."""
+        distances = bytearray([UNSOLVABLE]) * TABLE_SIZE
+        level = []
+        for number in range(TABLE_SIZE):
+            state = abstract_state(number)
+            if state is not None and st.is_solved(state):
+                distances[number] = 0
+                level.append(number)
+        dist = 0
+        while level:
+            dist += 1
+            next_level = []
+            for number in level:
+                for (next_state, _) in st.successors(abstract_state(number)):
+                    next_number = index(next_state)
+                    if distances[next_number] == UNSOLVABLE:
+                        distances[next_number] = dist
+                        next_level.append(next_number)
+            level = next_level
+        return cls(bytes(distances[number] | distances[number + 1] << 4
+                         for number in range(0, TABLE_SIZE, 2)), dist - 1)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        """Memory-map the table stored in the given file."""
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, moves = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC or version != _VERSION or count != TABLE_SIZE:
+            mapped.close()
+            raise ValueError("{} is not a pattern database".format(path))
+        table = cls(memoryview(mapped)[_HEADER.size:], moves)
+        table._map = mapped
+        return table
+
+    def save(self, path=DEFAULT_PATH):
+        """Store the table in the given file."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, _VERSION, len(self), self.moves))
+            file.write(self._entries)
+        os.replace(tmp_path, path)
+
+    def __len__(self):
+        return 2 * len(self._entries)
+
+    def bound(self, state):
+        """Return a lower bound on the number of moves needed to solve the
+        given state, or None if the state cannot be solved."""
+        if st.is_solved(state):
+            return 0
+        number = index(state)
+        dist = self._entries[number >> 1] >> ((number & 1) << 2) & 0xf
+        return None if dist == UNSOLVABLE else dist
+
+
+_tables = {}
+
+
+def table(path=DEFAULT_PATH):
+    """Return the table stored at the given path, building and storing it
+    first if necessary.  Tables are shared by all callers using the same
+    path, so each is loaded only once per process."""
+    if path not in _tables:
+        if not os.path.exists(path):
+            PatternTable.build().save(path)
+        _tables[path] = PatternTable.load(path)
+    return _tables[path]
@@ -0,0 +1,198 @@
+###############################################################################
+#
+# rush_hour/puzzle_db.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides access to the puzzle database.
+
+The database is a text file with one puzzle per line.  Each line consists of
+the number of moves of an optimal solution, the 36-character representation
+of the puzzle, and the size of the cluster of states reachable from the
+puzzle.  Puzzles are numbered by their line numbers, starting from 0.
+
+Looking up a puzzle in the text file requires a linear scan, so build_index()
+converts the text file into a binary database with fixed-width records and a
+hash index over the puzzle strings.  The binary database is stored next to the
+text file, with the extension .db, and has the following layout:
+
+- A 16-byte header consisting of the magic bytes RHDB, the format version,
+  the number of puzzles, and the number of slots of the hash index, stored
+  as 32-bit little-endian words
+- One 44-byte record per puzzle, consisting of the puzzle string, the number
+  of optimal moves as a 16-bit word, two bytes of padding, and the cluster
+  size as a 32-bit word
+- The hash index, an open-addressing hash table with linear probing of
+  32-bit words.  A slot stores 1 plus the number of the puzzle it refers to,
+  or 0 if it is empty.  The hash function is the CRC32 of the puzzle string.
+
+PuzzleDB memory-maps the binary database if it exists and is at least as
+recent as the text file, and falls back to scanning the text file otherwise."""
+
+
+from array import array
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+
+DEFAULT_PATH = "../rush_no_walls.txt"
+
+_MAGIC = b"RHDB"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIII")
+_RECORD = struct.Struct("<36sHxxI")
+_SLOT = struct.Struct("<I")
+
+
+def index_path(path):
+    """Return the path of the binary database built from the given text
+    database."""
+    return os.path.splitext(path)[0] + ".db"
+
+
+def build_index(path=DEFAULT_PATH, db_path=None):
+    """Convert the given text database into a binary database stored at
+    db_path, which defaults to index_path(path).  Return the number of
+    puzzles."""
+    if db_path is None:
+        db_path = index_path(path)
+    tmp_path = db_path + ".tmp"
+    hashes = array("I")
+    with open(path, "r") as text, open(tmp_path, "wb") as binary:
+        binary.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0))
+        for line in text:
+            fields = line.split()
+            board = fields[1].encode()
+            binary.write(_RECORD.pack(board, int(fields[0]), int(fields[2])))
+            hashes.append(zlib.crc32(board))
+        slots = 16
+        while slots < 2 * len(hashes):
+            slots <<= 1
+        table = array("I", bytes(4 * slots))
+        for (number, hashed) in enumerate(hashes):
+            slot = hashed & (slots - 1)
+            while table[slot]:
+                slot = (slot + 1) & (slots - 1)
+            table[slot] = number + 1
+        if sys.byteorder == "big":
+            table.byteswap()
+        binary.write(table.tobytes())
+        binary.seek(0)
+        binary.write(_HEADER.pack(_MAGIC, _VERSION, len(hashes), slots))
+    os.replace(tmp_path, db_path)
+    return len(hashes)
+
+
+class PuzzleDB:
+    """Random access to the puzzle database by puzzle number and by puzzle
+    string"""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self._path = path
+        self._file = None
+        self._map = None
+        self._count = None
+        db_path = index_path(path)
+        if os.path.exists(db_path) and (
+                not os.path.exists(path) or
+                os.path.getmtime(db_path) >= os.path.getmtime(path)):
+            self._open_index(db_path)
+
+    def _open_index(self, db_path):
+        """Memory-map the binary database at db_path."""
+        self._file = open(db_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, self._slots = \
+            _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError("{} is not a puzzle database".format(db_path))
+        self._index_offset = _HEADER.size + self._count * _RECORD.size
+
+    @property
+    def indexed(self):
+        """True if lookups use the binary database."""
+        return self._map is not None
+
+    def close(self):
+        """Release the memory map of the binary database, if any."""
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        if self._count is None:
+            with open(self._path, "r") as file:
+                self._count = sum(1 for _ in file)
+        return self._count
+
+    def puzzle(self, number):
+        """Return the puzzle with the given number as a triple consisting of
+        the number of optimal moves, the puzzle string, and the cluster size.
+        Raise IndexError if there is no such puzzle."""
+        if number < 0:
+            raise IndexError(number)
+        if self._map is None:
+            return self._scan_number(number)
+        if number >= self._count:
+            raise IndexError(number)
+        return self._record(number)
+
+    def lookup(self, board):
+        """Return the puzzle with the given puzzle string as a triple
+        consisting of its number, the number of optimal moves, and the
+        cluster size, or None if the puzzle is not in the database."""
+        if self._map is None:
+            return self._scan_board(board)
+        encoded = board.encode()
+        mask = self._slots - 1
+        slot = zlib.crc32(encoded) & mask
+        while True:
+            entry, = _SLOT.unpack_from(self._map,
+                                       self._index_offset + 4 * slot)
+            if not entry:
+                return None
+            offset = _HEADER.size + (entry - 1) * _RECORD.size
+            if self._map[offset:offset + 36] == encoded:
+                moves, _, size = self._record(entry - 1)
+                return entry - 1, moves, size
+            slot = (slot + 1) & mask
+
+    def _record(self, number):
+        """Decode the record of the given puzzle in the binary database."""
+        board, moves, size = _RECORD.unpack_from(
+            self._map, _HEADER.size + number * _RECORD.size)
+        return moves, board.decode(), size
+
+    def _scan_number(self, number):
+        """Find the puzzle with the given number in the text database."""
+        with open(self._path, "r") as file:
+            for (count, line) in enumerate(file):
+                if count == number:
+                    fields = line.split()
+                    return int(fields[0]), fields[1], int(fields[2])
+        raise IndexError(number)
+
+    def _scan_board(self, board):
+        """Find the puzzle with the given puzzle string in the text
+        database."""
+        with open(self._path, "r") as file:
+            for (number, line) in enumerate(file):
+                fields = line.split()
+                if fields[1] == board:
+                    return number, int(fields[0]), int(fields[2])
+        return None
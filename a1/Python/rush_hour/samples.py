@@ -0,0 +1,28 @@
+###############################################################################
+#
+# rush_hour/samples.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides sample boards, used by the benchmarks and the load
+generator of the solve server when no puzzles are given.  They do not depend
+on the contents of the puzzle database.  The large puzzles have large
+clusters."""
+
+
+SAMPLE_PUZZLES = [
+    "oBBCCCoooDDDAAooHIEEooHIoGFFFJoGoooJ",
+    "HoBBCCHDDEEEIAAKLMIooKLMFFJoLNooJGGN",
+    "BBCCooDDDJooHAAJooHoIJEEFFIooKooIGGK",
+    "BBBLCCJooLDDJAALoMEEKFFMooKoGGoHHHII",
+    "GBBoLoGHIoLMGHIAAMCCCKoMooJKDDEEJFFo",
+]
+
+LARGE_PUZZLES = [
+    "HHooDEooBBDEAAJooEoCJGGoKCoFooKooFII",
+    "ooJJooooBEDoAABEDIFHooDIFHoCCooooGGo",
+]
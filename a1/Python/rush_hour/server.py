@@ -0,0 +1,348 @@
+###############################################################################
+#
+# rush_hour/server.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a long-running solve server, a client for it, and a
+load generator to measure its latency.
+
+The server keeps the puzzle database and, optionally, a solution cache open
+and solves puzzles in a pool of worker processes set up as in
+rush_hour.batch, so the cost of starting the interpreter, building the move
+tables, and opening the database is paid once, not once per puzzle.  It
+listens on a Unix socket or, if the address has the form host:port, on a TCP
+port, and runs on an asyncio event loop that only dispatches requests and
+answers from the cache; all solving happens in the workers.
+
+Clients send one JSON object per line and receive one JSON object per line.
+A request has the form
+
+    {"id": 1, "puzzle": 1234, "strategy": "bfs", "timeout": 10}
+
+where the puzzle is given either as a puzzle number ("puzzle") or as a
+36-character board ("board"), and strategy and timeout are optional.  The id
+is a string, an integer, or null; a request with any other id is answered
+with status "error" right away.  The answer has the form
+
+    {"id": 1, "status": "solved", "board": "...", "moves": [...],
+     "time": 0.012}
+
+where moves lists the moves in the encoding of rush_hour.state and status is
+one of the statuses of rush_hour.batch or "cancelled" or "error".  A request
+of the form {"id": 1, "batch": [request, ...]} solves several puzzles at
+once; its answer is {"id": 1, "results": [answer, ...]}, or an answer with
+status "error" if the batch is not a list of requests.  A request of the
+form {"cancel": 1} cancels the request with id 1 on the same connection,
+which is then answered with status "cancelled".
+
+Requests on one connection are served concurrently and may be answered out of
+order.  The timeout of a request covers both the time it waits for a worker
+and the solving time, must be positive, and is capped by the server's maximum
+timeout.  Identical requests being solved at the same time are solved only
+once.  A cancelled or timed-out request that a worker has already started to
+solve keeps the worker busy until the solver notices the time limit; its
+solution is still stored in the cache."""
+
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+import os
+import signal
+import socket
+import statistics
+import time
+from rush_hour import batch, solver
+from rush_hour.cache import SolutionCache, key_of
+from rush_hour.puzzle_db import DEFAULT_PATH, PuzzleDB
+
+
+DEFAULT_ADDRESS = "../rush-hour.sock"
+DEFAULT_TIMEOUT = 60.0
+
+CANCELLED = "cancelled"
+ERROR = "error"
+
+
+def parse_address(address):
+    """Return the TCP address (host, port) described by an address of the
+    form host:port, or the given address, which is the path of a Unix socket,
+    otherwise."""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit():
+        return host, int(port)
+    return address
+
+
+class SolveServer:
+    """A solve server using a pool of jobs worker processes (one per core by
+    default), the puzzle database at the given path, and the solution cache
+    at the given path, if any"""
+
+    def __init__(self, jobs=None, path=DEFAULT_PATH, cache_path=None,
+                 max_timeout=DEFAULT_TIMEOUT, memory_limit=None):
+        self._jobs = jobs or os.cpu_count() or 1
+        self._database = PuzzleDB(path)
+        self._cache = SolutionCache(cache_path) if cache_path else None
+        self._max_timeout = max_timeout
+        self._pool = ProcessPoolExecutor(max_workers=self._jobs,
+                                         initializer=batch.init_worker,
+                                         initargs=(path, memory_limit))
+        self._solving = {}
+        self.requests = 0
+
+    async def serve(self, address=DEFAULT_ADDRESS):
+        """Start the workers and serve requests on the given address until
+        the server receives SIGINT or SIGTERM."""
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(
+                signum, lambda: stop.done() or stop.set_result(None))
+        await asyncio.gather(*(loop.run_in_executor(self._pool, os.getpid)
+                               for _ in range(self._jobs)))
+        address = parse_address(address)
+        if isinstance(address, tuple):
+            server = await asyncio.start_server(self._serve_client, *address)
+        else:
+            if os.path.exists(address):
+                os.remove(address)
+            server = await asyncio.start_unix_server(self._serve_client,
+                                                     address)
+        async with server:
+            await stop
+        if not isinstance(address, tuple):
+            os.remove(address)
+
+    def close(self):
+        """Shut down the workers and close the database and the cache."""
+        self._pool.shutdown(cancel_futures=True)
+        self._database.close()
+        if self._cache is not None:
+            self._cache.close()
+
+    async def _serve_client(self, reader, writer):
+        """Answer the requests received from one client."""
+        tasks = {}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    _send(writer, {"status": ERROR,
+                                   "message": "Malformed request"})
+                    continue
+                if "cancel" in request:
+                    task = tasks.get(request["cancel"]) \
+                        if _valid_id(request["cancel"]) else None
+                    if task:
+                        task.cancel()
+                    continue
+                key = request.get("id")
+                if not _valid_id(key):
+                    _send(writer, {"id": key, "status": ERROR,
+                                   "message": "A request id must be a string, "
+                                   "an integer, or null"})
+                    continue
+                tasks[key] = asyncio.ensure_future(
+                    self._answer(request, writer))
+                tasks[key].add_done_callback(
+                    lambda task, key=key: _finish(task, key, tasks, writer))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            writer.close()
+
+    async def _answer(self, request, writer):
+        """Answer the given request, or each request in its batch, and send
+        the answer to the given writer."""
+        if "batch" in request:
+            items = request["batch"]
+            if isinstance(items, list) and \
+                    all(isinstance(item, dict) for item in items):
+                results = await asyncio.gather(*(
+                    self._solve_request(item) for item in items))
+                answer = {"id": request.get("id"), "results": results}
+            else:
+                answer = {"id": request.get("id"), "status": ERROR,
+                          "message": "A batch must be a list of requests"}
+        else:
+            answer = await self._solve_request(request)
+        if not writer.is_closing():
+            _send(writer, answer)
+
+    async def _solve_request(self, request):
+        """Solve the puzzle described by a single request and return the
+        answer."""
+        self.requests += 1
+        answer = {"id": request.get("id") if isinstance(request, dict)
+                  else None}
+        start = time.perf_counter()
+        try:
+            if not isinstance(request, dict):
+                raise TypeError("A request must be an object")
+            board = self._board(request)
+            strategy = request.get("strategy", "bfs")
+            if strategy not in solver.STRATEGIES:
+                raise ValueError("Unknown strategy {}".format(strategy))
+            timeout = float(request.get("timeout", self._max_timeout))
+            if not math.isfinite(timeout) or timeout <= 0:
+                raise ValueError("A timeout must be a positive number of "
+                                 "seconds")
+            timeout = min(timeout, self._max_timeout)
+        except (KeyError, TypeError, ValueError) as error:
+            answer.update(status=ERROR, message=str(error))
+            return answer
+        if board is None:
+            answer.update(status=batch.NOT_FOUND)
+            return answer
+        answer["board"] = board
+        try:
+            status, solution = await asyncio.wait_for(
+                asyncio.shield(self._solve(board, strategy, timeout)),
+                timeout)
+        except asyncio.TimeoutError:
+            status, solution = batch.TIMEOUT, None
+        except Exception as error:
+            answer.update(status=ERROR, message=str(error))
+            return answer
+        answer.update(status=status, moves=solution,
+                      time=time.perf_counter() - start)
+        return answer
+
+    def _board(self, request):
+        """Return the board of the puzzle described by the given request, or
+        None if there is no puzzle with the given number."""
+        if "board" in request:
+            board = request["board"]
+            if not isinstance(board, str) or len(board) != 36:
+                raise ValueError("A board must be a 36-character string")
+            return board
+        try:
+            return self._database.puzzle(int(request["puzzle"]))[1]
+        except IndexError:
+            return None
+
+    def _solve(self, board, strategy, timeout):
+        """Return a future that resolves to the status and solution of the
+        given board, sharing the future with identical requests that are
+        being solved already."""
+        request = (board, strategy, timeout)
+        if request not in self._solving:
+            future = asyncio.ensure_future(self._run(board, strategy,
+                                                     timeout))
+            self._solving[request] = future
+            future.add_done_callback(
+                lambda _: self._solving.pop(request, None))
+        return self._solving[request]
+
+    async def _run(self, board, strategy, timeout):
+        """Look the given board up in the cache or solve it in a worker."""
+        if self._cache is not None:
+            key = key_of(board)
+            found, solution = self._cache.lookup(key)
+            if found:
+                return (batch.SOLVED if solution else batch.UNSOLVABLE,
+                        solution)
+        status, _, _, solution, _ = \
+            await asyncio.get_running_loop().run_in_executor(
+                self._pool, batch.solve_board, board, strategy, timeout)
+        if self._cache is not None and \
+                status in (batch.SOLVED, batch.UNSOLVABLE):
+            self._cache.store(key, solution)
+        return status, solution
+
+
+def _valid_id(key):
+    """Check whether the given value can be used as a request id."""
+    return key is None or isinstance(key, (str, int))
+
+
+def _finish(task, key, tasks, writer):
+    """Forget the given finished task answering the request with the given
+    id.  If the task was cancelled, answer the request with status
+    CANCELLED."""
+    if tasks.get(key) is task:
+        del tasks[key]
+    if task.cancelled() and not writer.is_closing():
+        _send(writer, {"id": key, "status": CANCELLED})
+
+
+def _send(writer, answer):
+    """Send the given answer as a line of JSON."""
+    writer.write(json.dumps(answer).encode() + b"\n")
+
+
+def send_request(address, message, timeout=None):
+    """Send the given request to the server at the given address and return
+    its answer.  This is a blocking client for one request at a time."""
+    address = parse_address(address)
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall(json.dumps(message).encode() + b"\n")
+        with sock.makefile("rb") as file:
+            line = file.readline()
+    if not line:
+        raise ConnectionError("The server closed the connection")
+    return json.loads(line)
+
+
+async def open_connection(address):
+    """Open an asyncio connection to the server at the given address."""
+    address = parse_address(address)
+    if isinstance(address, tuple):
+        return await asyncio.open_connection(*address)
+    return await asyncio.open_unix_connection(address)
+
+
+async def generate_load(address, puzzles, requests, concurrency,
+                        strategy="bfs"):
+    """Send requests requests for the given puzzles (numbers or boards, used
+    round-robin) to the server at the given address from concurrency clients,
+    each of which sends its next request as soon as it has received the
+    answer to the previous one.  Return the list of latencies in seconds and
+    the dictionary of counts of answers by status."""
+    latencies = []
+    counts = {}
+    queue = iter(range(requests))
+
+    async def client():
+        reader, writer = await open_connection(address)
+        for number in queue:
+            puzzle = puzzles[number % len(puzzles)]
+            message = {"id": number, "strategy": strategy}
+            message["board" if isinstance(puzzle, str) else "puzzle"] = \
+                puzzle
+            start = time.perf_counter()
+            writer.write(json.dumps(message).encode() + b"\n")
+            answer = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            counts[answer["status"]] = counts.get(answer["status"], 0) + 1
+        writer.close()
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, counts
+
+
+def percentile(values, fraction):
+    """Return the given fraction-quantile of the given values."""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=1000,
+                                method="inclusive")[round(fraction * 1000) - 1]
@@ -8,87 +8,272 @@
 ###############################################################################
 
 
-"""This module provides the logic to solve a Rush Hour puzzle.  There is
-nothing fancy here.  This only applies a breadth-first search of the state
-space starting from the initial board state.  In this state space, two states
-are neighbours if one of them can be transformed into the other by moving a
-single piece."""
+"""This module provides the logic to solve a Rush Hour puzzle.  The default
+strategy applies a breadth-first search of the state space starting from the
+initial board state.  In this state space, two states are neighbours if one of
+them can be transformed into the other by moving a single piece.  The informed
+strategies provided by rush_hour.informed explore the same state space guided
+by a heuristic, and the bidirectional strategy searches from the initial board
+state and from all solved states at the same time.  The cluster strategy
+provided by rush_hour.cluster builds the table of distances to the nearest
+solved state for all states reachable from the initial board state once, and
+answers all later queries for states in the same cluster from this table.  If
+NumPy is installed, the numpy strategy provided by rush_hour.vector runs the
+same BFS as the default strategy, but expands whole BFS levels at once.  The
+external strategy provided by rush_hour.external keeps its BFS levels on disk
+and uses at most a given budget of memory.  The parallel strategy provided by
+rush_hour.parallel runs the same BFS as the default strategy, but splits every
+BFS level over a number of worker processes.  All strategies find optimal
+solutions."""
 
 
+from collections import namedtuple
+import time
 import rush_hour.state as st
+from rush_hour import cluster, external, informed, parallel
+from rush_hour.table import StateTable
+try:
+    from rush_hour import vector
+except ImportError:
+    vector = None
 
 
-def run(puzzle):
+def run(puzzle, strategy="bfs", **options):
     """Solve a Rush hour puzzle represented as 36-character string listing the
     6x6 cells of the board in row-major order.  Empty cells are marked with
     "o".  Occupied cells are marked with letters representing pieces.  Cells
-    occupied by the same piece carry the same letter."""
-    return _Solver(puzzle).run()
+    occupied by the same piece carry the same letter.  The strategy is one of
+    the names in STRATEGIES.  The informed strategies accept the name of the
+    heuristic to use as the option heuristic.  The bfs strategy accepts a
+    rush_hour.stats.SearchStats object as the option stats, and a budget
+    given by the options deadline, a value of time.monotonic() by which the
+    search has to stop, and max_states, the number of states it may discover.
+    If the budget runs out, the result is a BudgetExceeded object.  The bfs
+    strategy also accepts a function as the option progress, which is called
+    with a Progress object after every BFS level."""
+    return make_solver(puzzle, strategy, **options).run()
+
+
+def make_solver(puzzle, strategy="bfs", **options):
+    """Construct the solver object used by run() for the given strategy.  Its
+    run() method computes the solution, and its expanded and states_seen
+    attributes report how much of the state space it explored."""
+    try:
+        solver_class = _SOLVERS[strategy]
+    except KeyError:
+        raise ValueError("Unknown strategy {}".format(strategy)) from None
+    return solver_class(puzzle, **options)
+
+
+TIME_LIMIT = "time limit"
+STATE_LIMIT = "state limit"
+
+Progress = namedtuple("Progress", [
+    "depth", "frontier", "states", "expanded", "elapsed"])
+Progress.__doc__ = """The progress of a BFS after completing a level: the
+depth of the level, the number of states in it, the number of states
+discovered and expanded so far, and the time spent in seconds"""
+
+
+class BudgetExceeded(namedtuple("BudgetExceeded", [
+        "reason", "depth", "states", "expanded", "elapsed"])):
+    """The result of a search that ran out of its budget: the reason
+    (TIME_LIMIT or STATE_LIMIT), the depth of the BFS level being expanded at
+    the time, so every solution has more than depth moves, the number of
+    states discovered and expanded, and the time spent in seconds.  Like the
+    result for an unsolvable puzzle, it is false in a boolean context."""
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
 
 
 class _Solver:
-    """The state of the solver"""
+    """The state of the solver.  If a rush_hour.stats.SearchStats object is
+    given, the solver records the statistics of every BFS level in it.  If a
+    deadline or a maximum number of states is given, the solver checks
+    whether it has reached them at the start of every BFS level and every 64
+    expansions, so it may discover a few hundred states more than the
+    maximum."""
 
-    def __init__(self, string_rep):
+    def __init__(self, string_rep, stats=None, deadline=None,
+                 max_states=None, progress=None):
         start_state = st.from_string_rep(string_rep)
-        self._current = [([], start_state)]
-        self._next = []
-        self._seen = {start_state}
+        self._seen = StateTable()
+        self._seen.add(st.pack(start_state))
+        self._stats = stats
+        if stats is not None:
+            self._moves = lambda state: stats.count(st.successors(state))
+        self._deadline = deadline
+        self._max_states = max_states
+        self._progress = progress
+        self.expanded = 0
+
+    @property
+    def states_seen(self):
+        """The number of distinct states discovered so far."""
+        return len(self._seen)
 
     def run(self):
-        """Run the solver from the start state."""
-        while True:
-            for seq in self._current:
-                sol = self._search(seq)
+        """Run the solver from the start state.  The visited table lists states
+        in the order in which they were discovered, so each BFS level is the
+        range of states added while expanding the previous level."""
+        stats = self._stats
+        if stats:
+            stats.start()
+        budgeted = self._deadline is not None or self._max_states is not None
+        started = time.monotonic()
+        depth = 0
+        start, end = 0, len(self._seen)
+        while start < end:
+            for index in range(start, end):
+                if budgeted and (index == start or not index & 63):
+                    reason = self._exhausted()
+                    if reason:
+                        return BudgetExceeded(reason, depth, len(self._seen),
+                                              self.expanded,
+                                              time.monotonic() - started)
+                sol = self._search(index)
                 if sol:
+                    if stats:
+                        # The solved state is new but not added to the table
+                        stats.level(index + 1 - start,
+                                    len(self._seen) - end + 1,
+                                    self._seen.nbytes)
+                        stats.goal(sol)
                     return sol
-            if self._next:
-                self._current = self._next
-                self._next = []
-            else:
-                return None
-
-    def _search(self, path):
-        """See whether the given path (sequence of moves) can be extended with
-        a single move to obtain a solution.  If so, return this solution.
-        Otherwise, return None and, as a side effect, add all extensions of
-        this path that end in a previously unexplored state to the frontier to
-        be explored at the next BFS level."""
-        state = path[1]
-        for (next_state, move) in self._moves(state):
+            if stats:
+                stats.level(end - start, len(self._seen) - end,
+                            self._seen.nbytes)
+            if self._progress:
+                self._progress(Progress(depth, end - start, len(self._seen),
+                                        self.expanded,
+                                        time.monotonic() - started))
+            depth += 1
+            start, end = end, len(self._seen)
+        return None
+
+    def _exhausted(self):
+        """Return the reason why the budget is exhausted, or None if it is
+        not."""
+        if self._max_states is not None and \
+                len(self._seen) >= self._max_states:
+            return STATE_LIMIT
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return TIME_LIMIT
+        return None
+
+    def _search(self, index):
+        """See whether the state with the given index in the visited table can
+        be transformed into a solved state using a single move.  If so, return
+        the sequence of moves that leads from the start state to this solved
+        state.  Otherwise, return None and, as a side effect, add all
+        previously unexplored successors of this state to the visited table,
+        together with the index of this state and the move that reached them.
+        This makes them part of the frontier to be explored at the next BFS
+        level."""
+        seen = self._seen
+        self.expanded += 1
+        for (next_state, move) in self._moves(st.unpack(seen.key(index))):
             if st.is_solved(next_state):
-                return path[0] + [move]
-            if next_state not in self._seen:
-                self._next.append((path[0] + [move], next_state))
-                self._seen.add(next_state)
+                return seen.path(index) + [move]
+            seen.add(st.pack(next_state), index, move)
         return None
 
-    @staticmethod
-    def _moves(state):
-        """Generate all valid moves from the given state.  This is an iterator
-        that yields (new_state, move) pairs where move is a valid move
-        applicable to state and new_state is the resulting new state."""
-        for pos in range(64):
-            if st.is_end(state, pos):
-                if st.is_horizontal(state, pos):
-                    for k in range(1, 5):
-                        new_state = st.horizontal_move(state, pos, k)
-                        if not new_state:
-                            break
-                        yield (new_state, st.make_move(pos, k))
-                    for k in range(1, 5):
-                        new_state = st.horizontal_move(state, pos, -k)
-                        if not new_state:
-                            break
-                        yield (new_state, st.make_move(pos, -k))
-                if st.is_vertical(state, pos):
-                    for k in range(1, 5):
-                        new_state = st.vertical_move(state, pos, k)
-                        if not new_state:
-                            break
-                        yield (new_state, st.make_move(pos, k))
-                    for k in range(1, 5):
-                        new_state = st.vertical_move(state, pos, -k)
-                        if not new_state:
-                            break
-                        yield (new_state, st.make_move(pos, -k))
+    _moves = staticmethod(st.successors)
+
+
+class _BidirectionalSolver:
+    """A bidirectional BFS that grows one search forward from the start state
+    and one backward from all solved states with the same pieces as the start
+    state.  Since every move can be undone, the backward search uses the same
+    moves as the forward search.  In every step, the search with the smaller
+    frontier expands its frontier by one level.  The first time one search
+    reaches a state discovered by the other search, the two half-paths through
+    this state form an optimal solution: any shorter solution would have been
+    found while expanding an earlier level."""
+
+    def __init__(self, string_rep):
+        start_state = st.from_string_rep(string_rep)
+        self._forward = StateTable()
+        self._forward.add(st.pack(start_state))
+        self._backward = StateTable()
+        for state in st.solved_states(start_state):
+            self._backward.add(st.pack(state))
+        self.expanded = 0
+
+    @property
+    def states_seen(self):
+        """The number of distinct states discovered so far by both
+        searches."""
+        return len(self._forward) + len(self._backward)
+
+    def run(self):
+        """Run the two searches until they meet or one of them runs out of
+        states to explore."""
+        forward, backward = self._forward, self._backward
+        fwd_start, fwd_end = 0, len(forward)
+        bwd_start, bwd_end = 0, len(backward)
+        while fwd_start < fwd_end and bwd_start < bwd_end:
+            if fwd_end - fwd_start <= bwd_end - bwd_start:
+                meeting = self._expand(forward, backward, fwd_start, fwd_end)
+                if meeting:
+                    index, move, other = meeting
+                    return forward.path(index) + [move] + \
+                        self._backward_path(other)
+                fwd_start, fwd_end = fwd_end, len(forward)
+            else:
+                meeting = self._expand(backward, forward, bwd_start, bwd_end)
+                if meeting:
+                    index, move, other = meeting
+                    state = st.unpack(backward.key(index))
+                    return forward.path(other) + \
+                        [st.reverse_move(state, move)] + \
+                        self._backward_path(index)
+                bwd_start, bwd_end = bwd_end, len(backward)
+        return None
+
+    def _expand(self, table, other, start, end):
+        """Expand the states with indices start to end - 1 in the given
+        table, adding their successors to the table.  If a successor is found
+        in the other table, stop and return a triple consisting of the index
+        of the expanded state, the move that reaches the successor, and the
+        index of the successor in the other table.  Otherwise, return None."""
+        for index in range(start, end):
+            self.expanded += 1
+            for (next_state, move) in st.successors(
+                    st.unpack(table.key(index))):
+                key = st.pack(next_state)
+                other_index = other.index(key)
+                if other_index >= 0:
+                    return index, move, other_index
+                table.add(key, index, move)
+        return None
+
+    def _backward_path(self, index):
+        """Return the sequence of moves that leads from the state with the
+        given index in the backward table to the solved state the backward
+        search reached it from."""
+        backward = self._backward
+        moves = []
+        while backward.parent(index) >= 0:
+            parent = backward.parent(index)
+            moves.append(st.reverse_move(st.unpack(backward.key(parent)),
+                                         backward.move(index)))
+            index = parent
+        return moves
+
+
+_SOLVERS = {
+    "bfs": _Solver,
+    "bidir": _BidirectionalSolver,
+    "astar": informed.AStarSolver,
+    "idastar": informed.IDAStarSolver,
+    "cluster": cluster.ClusterSolver,
+    "external": external.ExternalSolver,
+    "parallel": parallel.ParallelSolver,
+}
+if vector:
+    _SOLVERS["numpy"] = vector.VectorSolver
+STRATEGIES = tuple(_SOLVERS)
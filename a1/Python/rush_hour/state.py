@@ -19,101 +19,119 @@ vec[i], these four words have the following meaning:
 - occupied[i] = 1 if cell i is occupied by a piece
 - horiz[i] = 1    if cell i is occupied by a horizontal piece
 - vert[i] = 1     if cell i is occupied by a vertical piece
-- ends[i] = 1     if cell i is the rightmost or bottommost cell of a piece"""
+- ends[i] = 1     if cell i is the rightmost or bottommost cell of a piece
 
+For compact storage, a state can also be packed into a single integer key
+using pack() and restored using unpack().  The key consists of two 64-bit words
+that only use the bits of the 36 cells inside the border.  The low word marks
+the cells occupied by horizontal pieces, the high word the cells occupied by
+vertical pieces, and both words mark the end cells of all pieces."""
 
-from io import StringIO
-from itertools import chain
+
+from itertools import chain, islice
 
 
 def from_string_rep(string_rep):
     """Construct a state from its string representation.  The input is a
     36-character string listing the 6x6 cells of the board in row-major order.
-    Empty cells are marked with "o".  Occupied cells are marked with letters
-    representing pieces.  Cells occupied by the same piece carry the same
-    letter."""
-    grid = _grid_from_string_rep(string_rep)
-    horiz, horiz_ends = _find_horiz_pieces(grid)
-    vert, vert_ends = _find_vert_pieces(grid)
-    occupied = vert | horiz
-    ends = horiz_ends | vert_ends
-    return (occupied, horiz, vert, ends)
-
-
-def _grid_from_string_rep(string_rep):
-    """Pad a 36-character string representation of a state into a 64-character
-    representation that includes empty cells to represent the borders around
-    the board."""
-    grid = StringIO()
-    print("oooooooo", file=grid, end="")
-    for i in range(6):
-        print("o{}o".format(string_rep[6*i:6*(i+1)]), file=grid, end="")
-    print("oooooooo", file=grid, end="")
-    return grid.getvalue()
-
-
-def _find_vert_pieces(grid):
-    """Find all vertical pieces on the board and return two words representing
-    the cells occupied by these pieces and the cells that are the bottommost
-    cells of these pieces."""
-    transposed_grid = _transpose_grid(grid)
-    transposed_bits, transposed_ends = \
-        _find_horiz_pieces(transposed_grid)
-    return _transpose_bits(transposed_bits), \
-        _transpose_bits(transposed_ends)
-
-
-def _find_horiz_pieces(grid):
-    """Find all horizontal pieces on the board and return two words
-    representing the cells occupied by these pieces and the cells that are the
-    rightmost cells of these pieces."""
-    bits = 0xff000000000000ff
-    ends = 0
-    for i in range(64):
-        cellbit, cellend = _horiz_bits(grid, i)
-        bits |= cellbit
-        ends |= cellend
-    return bits, ends
-
-
-def _horiz_bits(grid, pos):
-    """Return a pair of words representing position pos on the board.  The
-    first word is 1 << pos if the position is occupied and 0 otherwise.  The
-    second word is 1 << pos if the position is the rightmost position of a
-    piece and 0 otherwise."""
-    if grid[pos] == "o":
-        return 0, 0
-    if grid[pos] == grid[pos+1]:
-        return 1 << pos, 0
-    if grid[pos] == grid[pos-1]:
-        return 1 << pos, 1 << pos
-    else:
-        return 0, 0
-
-
-def _transpose_grid(grid):
-    """Rearranges the character in a 64-character string represending an 8x8
-    Rush Hour board so as to transpose the board."""
-    transposed_grid = StringIO()
-    for i in range(64):
-        j = ((i & 7) << 3) | ((i & 56) >> 3)
-        print(grid[j], file=transposed_grid, end="")
-    return transposed_grid.getvalue()
-
-
-def _transpose_bits(bits):
-    """Rearranges the bits in a 64-bit bit string representing an 8x8 board so
-    as to transpose the board."""
-    # 2x2 transpose of individual bits
-    trans = (bits ^ (bits << 7)) & 0x5500550055005500
-    bits = bits ^ trans ^ (trans >> 7)
-    # 2x2 transpose of 2x2 blocks
-    trans = (bits ^ (bits << 14)) & 0x3333000033330000
-    bits = bits ^ trans ^ (trans >> 14)
-    # 2x2 transpose of 4x4 blocks
-    trans = (bits ^ (bits << 28)) & 0x0f0f0f0f00000000
-    bits = bits ^ trans ^ (trans >> 28)
-    return bits
+    Empty cells are marked with "o".  Occupied cells are marked with (ASCII)
+    letters representing pieces.  Cells occupied by the same piece carry the
+    same letter.
+
+    The board is padded into an 8x8 grid of bytes, one per bit of the state,
+    with empty cells and border cells set to 0.  This grid is read as a single
+    integer, so every cell can be compared with its right neighbour and with
+    the cell below it using a few operations on the whole grid (see
+    _same_cells).  The resulting flags are turned into bits using
+    _flag_bits."""
+    return next(from_string_reps((string_rep,)))
+
+
+def from_string_reps(string_reps, chunk_size=1024):
+    """Construct the states of all string representations produced by the
+    given iterable, in order.  This is an iterator that reads the input in
+    chunks of chunk_size boards and processes each chunk as a single grid
+    spanning all its boards, so it needs memory only for one chunk at a
+    time."""
+    string_reps = iter(string_reps)
+    while True:
+        chunk = [_pad(string_rep)
+                 for string_rep in islice(string_reps, chunk_size)]
+        if not chunk:
+            return
+        size = 64 * len(chunk)
+        low = _LOW_BITS if size == 64 else \
+            int.from_bytes(b"\x7f" * size, "little")
+        cells = int.from_bytes(b"".join(chunk), "little")
+        horiz_same = _same_cells(cells, cells >> 8, low)
+        vert_same = _same_cells(cells, cells >> 64, low)
+        horiz = _flag_bits(horiz_same | horiz_same << 8, size)
+        vert = _flag_bits(vert_same | vert_same << 64, size)
+        ends = _flag_bits((horiz_same << 8 & ~horiz_same) |
+                          (vert_same << 64 & ~vert_same), size)
+        # The digits list the boards from last to first
+        for end in range(size, 0, -64):
+            horiz_bits = int(horiz[end - 64:end], 2) | HORIZ_BORDER
+            vert_bits = int(vert[end - 64:end], 2) | VERT_BORDER
+            yield (horiz_bits | vert_bits, horiz_bits, vert_bits,
+                   int(ends[end - 64:end], 2))
+
+
+# Translation table mapping empty cells to 0
+_EMPTY_CELLS = bytes.maketrans(b"o", b"\0")
+# Translation table mapping flag bytes to "1" and all other bytes to "0"
+_FLAG_DIGITS = bytes.maketrans(bytes(range(256)), b"0" * 128 + b"1" * 128)
+_LOW_BITS = int.from_bytes(b"\x7f" * 64, "little")
+
+
+def _pad(string_rep):
+    """Pad a 36-character string representation of a state into the 64-byte
+    grid of its 8x8 board, with 0 bytes for empty cells and the border."""
+    cells = string_rep.encode().translate(_EMPTY_CELLS)
+    return b"".join((b"\0" * 9, cells[0:6], b"\0\0", cells[6:12], b"\0\0",
+                     cells[12:18], b"\0\0", cells[18:24], b"\0\0",
+                     cells[24:30], b"\0\0", cells[30:36], b"\0" * 9))
+
+
+def _same_cells(cells, others, low):
+    """Given two grids of bytes below 128, read as integers, return the grid
+    with byte value 128 for every nonzero byte of cells equal to the
+    corresponding byte of others, and 0 elsewhere.  low is the grid with all
+    bytes equal to 127.  A byte v below 128 is nonzero exactly if v + 127 has
+    its high bit set, and this addition never carries into the next byte."""
+    return (cells + low) & ~((cells ^ others) + low) & low << 1
+
+
+def _flag_bits(flags, size):
+    """Turn a grid of size flag bytes with value 128 or 0, read as an
+    integer, into a string of size binary digits listing the flags from the
+    last byte to the first.  The 64 digits of a board, read as a binary
+    number, are the word with a set bit for every flag of the board.  Flags
+    shifted beyond the last byte are dropped."""
+    grid = flags.to_bytes(size + 8, "little")[:size]
+    return grid.translate(_FLAG_DIGITS)[::-1]
+
+
+def to_string_rep(state):
+    """Construct the string representation of a state, lettering the pieces
+    as the puzzle database does: the red car, the rightmost horizontal piece
+    in the third row, is A, the other horizontal pieces follow in row-major
+    order, and the vertical pieces follow in column-major order."""
+    board_pieces = pieces(state)
+    horizontal = [piece for piece in board_pieces if piece[2]]
+    vertical = sorted((piece for piece in board_pieces if not piece[2]),
+                      key=lambda piece: (piece[0] & 7, piece[0]))
+    red = [piece for piece in horizontal if piece[0] >> 3 == 3][-1:]
+    cells = ["o"] * 64
+    for (letter, (end, length, is_horiz)) in zip(
+            "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+            red + [piece for piece in horizontal if piece not in red] +
+            vertical):
+        step = 1 if is_horiz else 8
+        for pos in range(end - (length - 1) * step, end + 1, step):
+            cells[pos] = letter
+    board = "".join(cells)
+    return "".join(board[row + 1:row + 7] for row in range(8, 56, 8))
 
 
 def pretty_print(state):
@@ -157,6 +175,35 @@ def _format_cell(state, pos):
     return [top, bottom]
 
 
+INNER_MASK = 0x007e7e7e7e7e7e00
+HORIZ_BORDER = 0xff000000000000ff
+VERT_BORDER = 0x8181818181818181
+WORD_MASK = 0xffffffffffffffff
+
+
+def pack(state):
+    """Pack a state into a single integer key.  occupied is not stored because
+    it can be recovered as horiz | vert."""
+    ends = state[3]
+    return (state[1] & INNER_MASK | ends) | \
+        (state[2] & INNER_MASK | ends) << 64
+
+
+def unpack(key):
+    """Restore the state packed into the given key by pack().  An end cell
+    belongs to a horizontal piece exactly if the cell to its left is a
+    non-end cell of a horizontal piece."""
+    horiz = key & WORD_MASK
+    vert = key >> 64
+    ends = horiz & vert
+    horiz ^= ends
+    vert ^= ends
+    horiz_ends = ends & (horiz << 1)
+    horiz |= horiz_ends | HORIZ_BORDER
+    vert |= (ends ^ horiz_ends) | VERT_BORDER
+    return (horiz | vert, horiz, vert, ends)
+
+
 def is_occupied(state, pos):
     """Check whether the posth cell is occupied."""
     return state[0] & (1 << pos)
@@ -190,97 +237,221 @@ def make_move(pos, offset):
     return (pos << 8) | (offset + 4)
 
 
-def vertical_move(state, pos, offset):
-    """Move the vertical piece occupying position pos by offset positions.  A
-    negative offset means move up.  A positive offset means move down.  The
-    return value is the new state and a representation of the move as a 16-bit
-    word.  If the move is invalid because it moves the piece off the board or
-    across another piece, two None values are returned."""
-    stop = state[0] & \
-        (state[1] ^ 0xffffffffffffffff) & \
-        (state[3] ^ 0xffffffffffffffff)
-    return _move(state, pos, offset, stop, 8, 0x0101010101010101)
-
-
-def horizontal_move(state, pos, offset):
-    """Move the horizontal piece occupying position pos by offset positions.  A
-    negative offset means move left.  A positive offset means move right.  The
-    return value is the new state and a representation of the move as a 16-bit
-    word.  If the move is invalid because it moves the piece off the board or
-    across another piece, two None values are returned."""
-    stop = state[0] & \
-        (state[2] ^ 0xffffffffffffffff) & \
-        (state[3] ^ 0xffffffffffffffff)
-    return _move(state, pos, offset, stop, 1, 0xffffffffffffffff)
-
-
-def _move(state, pos, offset, stop, skip, mask):
-    """This is the worker that implements both horizontal and vertical
-    moves."""
-
-    # Construct the bit vector representing the positions occupied by the piece
-    # to be moved
-    piece = 1 << pos
-    left = piece >> skip
-    while stop & left:
-        piece |= left
-        left >>= skip
-
-    # Construct the new piece resulting from the move and
-    # - the leftmost and rightmost of piece and new_piece
-    # - the end positions of the leftmost and rightmost pieces
-    if offset < 0:
-        new_piece = piece >> (-offset * skip)
-        left, right = new_piece, piece
-        left_pos, right_pos = pos + offset * skip, pos
-    else:
-        new_piece = piece << (offset * skip)
-        left, right = piece, new_piece
-        left_pos, right_pos = pos, pos + offset * skip
-
-    # Abort if the new piece is out of bounds
-    if left_pos < 9 + skip or right_pos > 54:
-        return None
-
-    # Construct the swath of cells over which the piece moves from its old to
-    # its new position.
-    left = left | (mask << left_pos)
-    right = right | (mask >> (64 - right_pos - skip))
-    swath = (left & right) ^ piece
-
-    # Abort if any of them is occupied.
-    if state[0] & swath:
+def apply_move(state, move):
+    """Try to apply the given move to state.  Return the new state if this
+    succeeds.  Otherwise, return None.  A move is valid only if its position is
+    the rightmost or bottommost cell of a piece."""
+    pos = move >> 8
+    if not is_end(state, pos):
         return None
+    for (new_state, valid_move) in _successors(state, 1 << pos):
+        if valid_move == move:
+            return new_state
+    return None
 
-    # Construct the change in occupied cells and the change in end cells
-    # resulting from the move
-    piece_delta = piece ^ new_piece
-    end_delta = (1 << pos) | (1 << (pos + offset * skip))
-
-    # Update occupied, horiz, and end if this was a horizontal move.
-    # Otherwise, update, occupied, vert, and end.
-    if skip == 1:
-        return (
-            state[0] ^ piece_delta,
-            state[1] ^ piece_delta,
-            state[2],
-            state[3] ^ end_delta
-        )
-    return (
-        state[0] ^ piece_delta,
-        state[1],
-        state[2] ^ piece_delta,
-        state[3] ^ end_delta
-    )
 
-
-def apply_move(state, move):
-    """Try to apply the given move to state.  Return the new state if this
-    succeeds.  Otherwise, return None."""
+def reverse_move(state, move):
+    """Return the move that undoes the given move after it has been applied to
+    state."""
     pos = move >> 8
     offset = (move & 0xff) - 4
-    if not is_occupied(state, pos):
-        return None
-    if is_horizontal(state, pos):
-        return horizontal_move(state, pos, offset)
-    return vertical_move(state, pos, offset)
+    step = 1 if is_horizontal(state, pos) else 8
+    return make_move(pos + offset * step, -offset)
+
+
+_COLUMN = 0x0101010101010101
+_GATHER_COLUMN = 0x0102040810204080
+
+
+def build_slide_tables():
+    """Build the tables of all slides of a piece along a row or column.  Both
+    tables are indexed by _slide_index(pattern, length, end), where pattern is
+    the occupancy of the 6 cells of the row or column inside the border,
+    length is the length of the piece, and end is the index of its rightmost
+    or bottommost cell in the row or column (1 to 6).  Each entry is a tuple of
+    (offset, delta, end_delta) triples, one per valid slide of the piece.
+    delta is the set of cells that change state when the piece slides by
+    offset cells, and end_delta is the set of cells whose end bits change.  In
+    the row table, cell i of a row is represented by bit i; in the column
+    table, cell i of a column is represented by bit 8i.  Entries only have to
+    be shifted to the position of the row or column on the board."""
+    row_slides = [()] * 1024
+    column_slides = [()] * 1024
+    for pattern in range(64):
+        line = pattern << 1 | 0x81
+        for length in (2, 3):
+            for end in range(length, 7):
+                piece = ((1 << length) - 1) << (end - length + 1)
+                if line & piece != piece:
+                    continue
+                slides = []
+                for offset in range(1, 7 - end):
+                    if line & (1 << (end + offset)):
+                        break
+                    slides.append((offset, piece ^ (piece << offset),
+                                   (1 << end) | (1 << (end + offset))))
+                for offset in range(1, end - length + 1):
+                    if line & (1 << (end - length + 1 - offset)):
+                        break
+                    slides.append((-offset, piece ^ (piece >> offset),
+                                   (1 << end) | (1 << (end - offset))))
+                index = _slide_index(pattern, length, end)
+                row_slides[index] = tuple(slides)
+                column_slides[index] = tuple(
+                    (offset, _spread(delta), _spread(end_delta))
+                    for (offset, delta, end_delta) in slides)
+    return row_slides, column_slides
+
+
+def _slide_index(pattern, length, end):
+    """Return the index of the slide table entry for the given row or column
+    pattern, piece length, and end index."""
+    return pattern << 4 | (length - 2) << 3 | end
+
+
+def _spread(bits):
+    """Spread the bits of a row over a column, so that bit i becomes bit
+    8i."""
+    return sum(1 << (8 * i) for i in range(8) if bits >> i & 1)
+
+
+_ROW_SLIDES, _COLUMN_SLIDES = build_slide_tables()
+
+
+def successors(state):
+    """Generate all valid moves from the given state.  This is an iterator
+    that yields (new_state, move) pairs where move is a valid move applicable
+    to state and new_state is the resulting new state.
+
+    Only the end cells of pieces are visited.  For each piece, the occupancy of
+    its row or column is extracted as a 6-bit pattern, which is used to look up
+    all valid slides of the piece in the slide tables.  Each slide is applied
+    by XORing the cells and end cells that change into the state."""
+    return _successors(state, state[3])
+
+
+def _successors(state, movable):
+    """Generate the valid moves of the pieces whose end cells are the set bits
+    of movable.  This is the worker behind successors and apply_move."""
+    occupied, horiz, vert, ends = state
+    while movable:
+        end = movable & -movable
+        movable ^= end
+        pos = end.bit_length() - 1
+        move = pos << 8 | 4
+        if horiz & end:
+            shift = pos & 56
+            back = pos - 2
+            index = ((occupied >> (shift + 1)) & 0x3f) << 4 | pos & 7
+            if horiz >> back & 1 and not ends >> back & 1:
+                index |= 8
+            for (offset, delta, end_delta) in _ROW_SLIDES[index]:
+                delta <<= shift
+                yield ((occupied ^ delta, horiz ^ delta, vert,
+                        ends ^ (end_delta << shift)), move + offset)
+        else:
+            shift = pos & 7
+            back = pos - 16
+            index = ((((occupied >> shift) & _COLUMN) * _GATHER_COLUMN
+                      >> 57) & 0x3f) << 4 | pos >> 3
+            if vert >> back & 1 and not ends >> back & 1:
+                index |= 8
+            for (offset, delta, end_delta) in _COLUMN_SLIDES[index]:
+                delta <<= shift
+                yield ((occupied ^ delta, horiz, vert ^ delta,
+                        ends ^ (end_delta << shift)), move + offset)
+
+
+def pieces(state):
+    """List the pieces on the board as (end, length, horizontal) triples,
+    where end is the position of the rightmost or bottommost cell of the piece
+    and horizontal is True for horizontal pieces.  Pieces are listed in order
+    of their end positions."""
+    result = []
+    ends = state[3]
+    while ends:
+        pos = (ends & -ends).bit_length() - 1
+        ends &= ends - 1
+        horizontal = bool(is_horizontal(state, pos))
+        step = 1 if horizontal else 8
+        cells = state[1] if horizontal else state[2]
+        length = 1
+        while cells & (1 << (pos - length * step)) and \
+                not is_end(state, pos - length * step):
+            length += 1
+        result.append((pos, length, horizontal))
+    return result
+
+
+def solved_states(state):
+    """Generate all solved states that consist of the same pieces as state,
+    with every piece in the same row (if horizontal) or column (if vertical) as
+    in state.  Since pieces cannot pass each other, only states where the
+    pieces in each row or column appear in the same order as in state are
+    generated.  The red car is the rightmost horizontal piece in the third row
+    of the board."""
+    board_pieces = pieces(state)
+    red_ends = [end for (end, _, horizontal) in board_pieces
+                if horizontal and end >> 3 == 3]
+    if not red_ends:
+        return
+    red_end = max(red_ends)
+    lines = {}
+    for (end, length, horizontal) in board_pieces:
+        line = end >> 3 if horizontal else end & 7
+        lines.setdefault((horizontal, line), []).append(
+            (length, end == red_end))
+    yield from solved_layouts(lines)
+
+
+def solved_layouts(lines):
+    """Generate all solved states with the given pieces in every row and
+    column.  lines maps pairs (horizontal, line) to the list of pieces in the
+    given row (if horizontal is True) or column (otherwise), in order, each
+    given as a pair (length, is_red).  Rows and columns are numbered from 1
+    to 6, so the red car is in row 3."""
+    groups = []
+    for (horizontal, line), members in lines.items():
+        if horizontal:
+            groups.append((1, 8 * line + 1, members))
+        else:
+            groups.append((8, 8 + line, members))
+    yield from _solved_layouts(groups, 0, 0, 0,
+                               HORIZ_BORDER, VERT_BORDER, 0)
+
+
+def _solved_layouts(groups, group, member, offset, horiz, vert, ends):
+    """This is the worker that places the pieces for solved_layouts.  groups
+    is a list of (step, first, members) triples, one per row or column that
+    contains pieces, where step is the distance between consecutive cells in
+    this row or column, first is the position of its first cell, and members
+    lists the (length, is_red) pairs of its pieces in order.  The piece to be
+    placed next is the memberth piece of the groupth group, and it can be
+    placed at offset offset or later in its row or column."""
+    if group == len(groups):
+        yield (horiz | vert, horiz, vert, ends)
+        return
+    step, first, members = groups[group]
+    if member == len(members):
+        yield from _solved_layouts(groups, group + 1, 0, 0, horiz, vert, ends)
+        return
+    length, is_red = members[member]
+    offsets = range(6 - length, 7 - length) if is_red else \
+        range(offset, 7 - length)
+    for start in offsets:
+        if start < offset:
+            continue
+        piece = 0
+        for i in range(start, start + length):
+            piece |= 1 << (first + i * step)
+        if (horiz | vert) & piece:
+            continue
+        end = 1 << (first + (start + length - 1) * step)
+        if step == 1:
+            yield from _solved_layouts(groups, group, member + 1,
+                                       start + length, horiz | piece, vert,
+                                       ends | end)
+        else:
+            yield from _solved_layouts(groups, group, member + 1,
+                                       start + length, horiz, vert | piece,
+                                       ends | end)
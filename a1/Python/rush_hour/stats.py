@@ -0,0 +1,119 @@
+###############################################################################
+#
+# rush_hour/stats.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the statistics the BFS solver can collect while it
+searches.  A SearchStats object passed to the solver records, for each BFS
+level, the number of states expanded, the number of successors generated,
+the number of successors rejected because they had been discovered before,
+the resulting branching factor, the time spent on the level, and the memory
+occupied by the visited table at the end of the level.  Callbacks can be
+registered to be notified whenever a level is complete and when a solution
+is found.
+
+A solver that is not given a SearchStats object does not collect any
+statistics and runs at full speed."""
+
+
+from collections import namedtuple
+import json
+import sys
+import time
+
+
+LevelStats = namedtuple("LevelStats", [
+    "depth", "frontier", "generated", "duplicates", "branching", "wall_time",
+    "memory"])
+LevelStats.__doc__ = """The statistics of one BFS level: its depth, the
+number of states expanded, the number of successors generated, the number of
+successors that had been discovered before, the average number of successors
+per expanded state, the time spent in seconds, and the number of bytes
+occupied by the visited table at the end of the level"""
+
+
+class SearchStats:
+    """The statistics of a search.  on_level is called with the LevelStats of
+    each level once the level is complete, on_goal with the solution once it
+    has been found."""
+
+    def __init__(self, on_level=None, on_goal=None):
+        self.levels = []
+        self.solution_length = None
+        self.wall_time = 0.0
+        self._on_level = on_level
+        self._on_goal = on_goal
+        self._generated = 0
+        self._start = self._level_start = None
+
+    def start(self):
+        """Record that the search starts."""
+        self._start = self._level_start = time.perf_counter()
+        self._generated = 0
+
+    def count(self, successors):
+        """Pass on the (new_state, move) pairs produced by the given
+        iterator, counting them as successors generated at the current
+        level."""
+        for successor in successors:
+            self._generated += 1
+            yield successor
+
+    def level(self, frontier, added, memory):
+        """Record that the current level is complete after expanding frontier
+        states, adding added new states to the visited table, which now
+        occupies memory bytes."""
+        now = time.perf_counter()
+        generated = self._generated
+        stats = LevelStats(len(self.levels), frontier, generated,
+                           generated - added,
+                           generated / frontier if frontier else 0.0,
+                           now - self._level_start, memory)
+        self.levels.append(stats)
+        self.wall_time = now - self._start
+        self._level_start = now
+        self._generated = 0
+        if self._on_level:
+            self._on_level(stats)
+
+    def goal(self, solution):
+        """Record that the given solution has been found."""
+        self.solution_length = len(solution)
+        self.wall_time = time.perf_counter() - self._start
+        if self._on_goal:
+            self._on_goal(solution)
+
+    def as_dict(self):
+        """Return the statistics as a dictionary that can be serialized as
+        JSON."""
+        return {
+            "solution_length": self.solution_length,
+            "wall_time": self.wall_time,
+            "expanded": sum(level.frontier for level in self.levels),
+            "generated": sum(level.generated for level in self.levels),
+            "levels": [level._asdict() for level in self.levels],
+        }
+
+    def print_json(self, file=sys.stderr):
+        """Print the statistics as a JSON object."""
+        json.dump(self.as_dict(), file, indent=2)
+        print(file=file)
+
+    def print_text(self, file=sys.stderr):
+        """Print the statistics as a table with one row per BFS level."""
+        print("{:>5}  {:>8}  {:>9}  {:>10}  {:>9}  {:>8}  {:>10}".format(
+            "Depth", "Frontier", "Generated", "Duplicates", "Branching",
+            "Time (s)", "Memory (kB)"), file=file)
+        for level in self.levels:
+            print("{:>5}  {:>8}  {:>9}  {:>10}  {:>9.2f}  {:>8.3f}  "
+                  "{:>10.1f}".format(level.depth, level.frontier,
+                                     level.generated, level.duplicates,
+                                     level.branching, level.wall_time,
+                                     level.memory / 1024), file=file)
+        print("Solution length   =", self.solution_length, file=file)
+        print("Total time (s)    = {:.3f}".format(self.wall_time), file=file)
@@ -0,0 +1,254 @@
+###############################################################################
+#
+# rush_hour/suite.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a reproducible benchmark suite for the solver
+strategies.
+
+Puzzles are picked from the database in tiers: the puzzles are grouped by the
+number of moves needed to solve them and by the size of their cluster, and a
+fixed number of puzzles is drawn from every group using a seeded random
+number generator, so the same database and seed always yield the same
+puzzles.
+
+Every strategy is run on every puzzle in a fresh worker process, so the peak
+memory reported for a run is not inflated by earlier runs.  The worker solves
+the puzzle a number of times to warm up (which, for the cluster strategy,
+builds the cluster's distance table in a temporary directory) and then a
+number of times while measuring wall time and CPU time.  Runs that exceed the
+time limit or the memory limit are reported with status "timeout" or "out of
+memory", runs whose worker dies with status "error".  The measurements of
+these runs are left empty.
+
+Results are rows of typed values, listed in FIELDS.  They can be written to
+and read from CSV and JSON files, and two sets of results can be compared to
+find regressions."""
+
+
+from collections import namedtuple
+import csv
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import statistics
+import tempfile
+import time
+from rush_hour import solver
+from rush_hour.batch import OUT_OF_MEMORY, SOLVED, TIMEOUT, UNSOLVABLE
+
+
+MOVE_TIERS = (1, 11, 21, 31, 41)
+SIZE_TIERS = (1, 100, 1000, 10000)
+ERROR = "error"
+
+FIELDS = [
+    ("puzzle", int),
+    ("board", str),
+    ("db_moves", int),
+    ("cluster_size", int),
+    ("strategy", str),
+    ("status", str),
+    ("moves", int),
+    ("wall_time_s", float),
+    ("wall_time_min_s", float),
+    ("cpu_time_s", float),
+    ("states", int),
+    ("peak_rss_kb", int),
+]
+
+Result = namedtuple("Result", [name for (name, _) in FIELDS])
+Result.__doc__ = """The result of running one strategy on one puzzle.
+Measurements that are not available, such as the times of a run that timed
+out, are None.  Times are medians over all measured runs, except
+wall_time_min_s, which is the fastest run.  CPU times do not include the
+time spent in processes started by the strategy, such as the workers of the
+parallel strategy."""
+
+
+def tier(value, bounds):
+    """Return the index of the tier the given value falls into, where bounds
+    lists the smallest value of every tier in increasing order."""
+    index = -1
+    for bound in bounds:
+        if value < bound:
+            break
+        index += 1
+    return index
+
+
+def select_puzzles(path, per_tier=2, seed=0):
+    """Pick per_tier puzzles from every combination of a move tier and a
+    cluster size tier from the text database at the given path.  Return a
+    list of (number, board, moves, cluster_size) tuples, ordered by number.
+    The puzzles in each group are drawn by reservoir sampling with the given
+    seed."""
+    rng = random.Random(seed)
+    groups = {}
+    with open(path, "r") as file:
+        for (number, line) in enumerate(file):
+            fields = line.split()
+            moves, size = int(fields[0]), int(fields[2])
+            group = (tier(moves, MOVE_TIERS), tier(size, SIZE_TIERS))
+            if group[0] < 0 or group[1] < 0:
+                continue
+            seen, picked = groups.setdefault(group, [0, []])
+            puzzle = (number, fields[1], moves, size)
+            if seen < per_tier:
+                picked.append(puzzle)
+            else:
+                slot = rng.randrange(seen + 1)
+                if slot < per_tier:
+                    picked[slot] = puzzle
+            groups[group][0] += 1
+    return sorted(puzzle for (_, picked) in groups.values()
+                  for puzzle in picked)
+
+
+def run_suite(puzzles, strategies=solver.STRATEGIES, warmups=1, repeats=3,
+              timeout=60.0, memory_limit=None):
+    """Run every strategy on every puzzle in the given list of (number,
+    board, moves, cluster_size) tuples.  This is an iterator that yields a
+    Result for every run as soon as it is complete.  timeout is the time
+    limit for all warmup and measured runs of one strategy on one puzzle in
+    seconds, memory_limit the memory limit of the worker in bytes."""
+    context = multiprocessing.get_context()
+    for (number, board, moves, size) in puzzles:
+        for strategy in strategies:
+            conn, worker_conn = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_measure,
+                args=(worker_conn, board, strategy, warmups, repeats,
+                      memory_limit))
+            process.start()
+            worker_conn.close()
+            if conn.poll(timeout):
+                try:
+                    measurements = conn.recv()
+                except EOFError:
+                    measurements = (ERROR,)
+            else:
+                process.kill()
+                measurements = (TIMEOUT,)
+            process.join()
+            conn.close()
+            measurements += (None,) * (7 - len(measurements))
+            yield Result(number, board, moves, size, strategy,
+                         *measurements)
+
+
+def _measure(conn, board, strategy, warmups, repeats, memory_limit):
+    """Run the given strategy on the given board in a worker process and
+    send the status, the solution length, the median and minimum wall time,
+    the median CPU time, the number of states seen, and the peak RSS in
+    kilobytes through the given pipe."""
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            options = {"directory": directory} \
+                if strategy in ("cluster", "external") else {}
+            for _ in range(warmups):
+                solver.run(board, strategy, **options)
+            wall_times, cpu_times = [], []
+            for _ in range(repeats):
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+                search = solver.make_solver(board, strategy, **options)
+                solution = search.run()
+                cpu_times.append(time.process_time() - cpu_start)
+                wall_times.append(time.perf_counter() - wall_start)
+    except MemoryError:
+        conn.send((OUT_OF_MEMORY,))
+        return
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send((SOLVED if solution else UNSOLVABLE,
+               len(solution) if solution else None,
+               statistics.median(wall_times), min(wall_times),
+               statistics.median(cpu_times), search.states_seen, peak_rss))
+
+
+def environment(**settings):
+    """Return a dictionary describing the machine the suite runs on, together
+    with the given settings."""
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    info.update(settings)
+    return info
+
+
+def write_csv(file, results):
+    """Write the given results to the given file in CSV format, flushing the
+    file after every row.  Missing measurements are written as empty
+    fields."""
+    writer = csv.writer(file)
+    writer.writerow(Result._fields)
+    for result in results:
+        writer.writerow(["" if value is None else
+                         "{:.6f}".format(value) if isinstance(value, float)
+                         else value for value in result])
+        file.flush()
+
+
+def write_json(file, results, info):
+    """Write the given results to the given file as a JSON object consisting
+    of the given environment description and the list of results."""
+    json.dump({"environment": info,
+               "results": [result._asdict() for result in results]},
+              file, indent=2)
+    print(file=file)
+
+
+def read_results(path):
+    """Read the results stored in the given CSV or JSON file."""
+    with open(path, "r", newline="") as file:
+        if path.endswith(".json"):
+            return [Result(**row) for row in json.load(file)["results"]]
+        return [Result(*(kind(value) if value != "" else None
+                         for ((_, kind), value) in zip(FIELDS, row)))
+                for row in list(csv.reader(file))[1:]]
+
+
+def compare(old, new, threshold=0.1, min_time=0.005):
+    """Compare two lists of results and return the list of regressions in
+    new, each a tuple (puzzle, strategy, field, old value, new value).  A run
+    regresses if it no longer solves its puzzle, if its solution length
+    changes, or if its wall time, CPU time, number of states, or peak RSS
+    grows by more than the given fraction.  Time differences of less than
+    min_time seconds are ignored as noise.  Runs that are present in only
+    one of the lists are ignored."""
+    before = {(result.puzzle, result.strategy): result for result in old}
+    regressions = []
+    for result in new:
+        base = before.get((result.puzzle, result.strategy))
+        if base is None:
+            continue
+        key = (result.puzzle, result.strategy)
+        if base.status != result.status:
+            if base.status in (SOLVED, UNSOLVABLE):
+                regressions.append(key + ("status", base.status,
+                                          result.status))
+            continue
+        if base.moves != result.moves:
+            regressions.append(key + ("moves", base.moves, result.moves))
+        for field in ("wall_time_s", "cpu_time_s", "states", "peak_rss_kb"):
+            old_value = getattr(base, field)
+            new_value = getattr(result, field)
+            if old_value is None or new_value is None:
+                continue
+            if field.endswith("_s") and new_value - old_value < min_time:
+                continue
+            if new_value > old_value * (1 + threshold):
+                regressions.append(key + (field, old_value, new_value))
+    return regressions
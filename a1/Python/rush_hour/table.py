@@ -0,0 +1,132 @@
+###############################################################################
+#
+# rush_hour/table.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a compact table of visited states for the solver.
+
+States are stored as packed keys (see rush_hour.state.pack) in contiguous
+arrays, in the order in which they were added.  Along with each state, the
+table records the index of the state it was reached from and the move that
+reached it, so the move sequence leading to any state can be reconstructed
+without storing paths.  Because states are numbered in insertion order, the
+table also serves as the BFS queue: every BFS level is a contiguous range of
+indices.
+
+Lookups use an open-addressing hash table with linear probing whose slots
+store state indices.  The hash table is doubled whenever it becomes half
+full."""
+
+
+from array import array
+
+
+_WORD_MASK = 0xffffffffffffffff
+_HASH_MULTIPLIER = 0x9e3779b97f4a7c15
+
+
+class StateTable:
+    """An insertion-ordered set of packed states with predecessor links"""
+
+    def __init__(self, capacity=1024):
+        size = 16
+        while size < 2 * capacity:
+            size <<= 1
+        self._keys = array("Q")
+        self._parents = array("i")
+        self._moves = array("H")
+        self._slots = array("i", bytes(4 * size))
+        self._shift = 64 - size.bit_length() + 1
+
+    def __len__(self):
+        return len(self._parents)
+
+    def __contains__(self, key):
+        return self.index(key) >= 0
+
+    @property
+    def nbytes(self):
+        """The number of bytes occupied by the arrays of the table"""
+        return sum(a.itemsize * len(a) for a in
+                   (self._keys, self._parents, self._moves, self._slots))
+
+    def add(self, key, parent=-1, move=0):
+        """Add the given key to the table, recording that it was reached from
+        the state with index parent using the given move.  Return the index of
+        the new state, or -1 if the key is already in the table."""
+        slot = self._find(key)
+        if self._slots[slot]:
+            return -1
+        index = len(self._parents)
+        self._keys.append(key & _WORD_MASK)
+        self._keys.append(key >> 64)
+        self._parents.append(parent)
+        self._moves.append(move)
+        self._slots[slot] = index + 1
+        if 2 * len(self._parents) > len(self._slots):
+            self._grow()
+        return index
+
+    def index(self, key):
+        """Return the index of the given key, or -1 if it is not in the
+        table."""
+        return self._slots[self._find(key)] - 1
+
+    def key(self, index):
+        """Return the key with the given index."""
+        return self._keys[2 * index] | self._keys[2 * index + 1] << 64
+
+    def parent(self, index):
+        """Return the index of the state from which the state with the given
+        index was reached, or -1 if this is a start state."""
+        return self._parents[index]
+
+    def move(self, index):
+        """Return the move that reached the state with the given index."""
+        return self._moves[index]
+
+    def relink(self, index, parent, move):
+        """Record that the state with the given index is reached from the
+        state with index parent using the given move, replacing the
+        predecessor recorded so far."""
+        self._parents[index] = parent
+        self._moves[index] = move
+
+    def path(self, index):
+        """Reconstruct the sequence of moves that leads from a start state to
+        the state with the given index."""
+        moves = []
+        while self._parents[index] >= 0:
+            moves.append(self._moves[index])
+            index = self._parents[index]
+        moves.reverse()
+        return moves
+
+    def _find(self, key):
+        """Return the slot that holds the given key or, if the key is not in
+        the table, the empty slot where it should be inserted."""
+        slots = self._slots
+        keys = self._keys
+        mask = len(slots) - 1
+        low, high = key & _WORD_MASK, key >> 64
+        slot = ((hash(key) * _HASH_MULTIPLIER) & _WORD_MASK) >> self._shift
+        while True:
+            entry = slots[slot]
+            if not entry:
+                return slot
+            entry = 2 * entry - 2
+            if keys[entry] == low and keys[entry + 1] == high:
+                return slot
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        """Double the size of the hash table and reinsert all states."""
+        self._slots = array("i", bytes(8 * len(self._slots)))
+        self._shift -= 1
+        for index in range(len(self._parents)):
+            self._slots[self._find(self.key(index))] = index + 1
@@ -0,0 +1,184 @@
+###############################################################################
+#
+# rush_hour/vector.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a breadth-first search engine that processes whole BFS
+levels at a time using NumPy.  It requires NumPy; rush_hour.solver offers it
+as the "numpy" strategy only if NumPy is installed.
+
+Each BFS level is stored as three uint64 arrays holding the horiz, vert, and
+ends words of its states (occupied is horiz | vert), together with an array
+holding, for each state, the index of the state in the previous level it was
+reached from and an array holding the move that reached it.
+
+All states in a cluster consist of the same pieces, each of which stays in
+its row or column.  Before the search starts, all slides a piece of the start
+state could possibly make are enumerated: for every piece length and
+orientation that occurs in a row or column and for every position and offset
+along this row or column.  Each such slide is described by a handful of
+masks.  To expand a level, every slide is applied to the whole level at once:
+a few vectorized bitwise operations determine the states in which the slide is
+valid and compute the resulting states.
+
+Since every move can be undone, a state discovered while expanding level d
+is either new or already belongs to level d - 1 or d.  New states are thus
+found by sorting the successors together with the states of the two previous
+levels and keeping every successor that is not equal to any of these states
+or to a successor that precedes it in sorted order."""
+
+
+import numpy as np
+import rush_hour.state as st
+
+
+def _candidate_slides(start_state):
+    """Enumerate all slides any piece of start_state could make in any state of
+    its cluster.  Each slide is a tuple (horizontal, piece, end, before, swath,
+    delta, end_delta, move), where piece is the set of cells the piece
+    occupies before the slide, end is its end cell, before is the cell in
+    front of the piece's first cell (which must not belong to the same piece),
+    swath is the set of cells the piece slides over, delta is the change in
+    the cells occupied by the piece, end_delta is the change in end cells, and
+    move is the encoded move.  All masks are NumPy uint64 scalars."""
+    lines = set()
+    for (end, length, horizontal) in st.pieces(start_state):
+        line = end >> 3 if horizontal else end & 7
+        lines.add((horizontal, line, length))
+    slides = []
+    for (horizontal, line, length) in sorted(lines):
+        step = 1 if horizontal else 8
+        first = 8 * line + 1 if horizontal else 8 + line
+        for start in range(7 - length):
+            piece = 0
+            for i in range(start, start + length):
+                piece |= 1 << (first + i * step)
+            end = first + (start + length - 1) * step
+            before = 1 << (first + (start - 1) * step)
+            for target in range(7 - length):
+                offset = target - start
+                if not offset:
+                    continue
+                swath = 0
+                for i in range(min(start, target), max(start, target) +
+                               length):
+                    swath |= 1 << (first + i * step)
+                swath &= ~piece
+                moved = piece << (offset * step) if offset > 0 else \
+                    piece >> (-offset * step)
+                end_delta = (1 << end) | (1 << (end + offset * step))
+                slides.append((horizontal, np.uint64(piece),
+                               np.uint64(1 << end), np.uint64(before),
+                               np.uint64(swath), np.uint64(piece ^ moved),
+                               np.uint64(end_delta),
+                               st.make_move(end, offset)))
+    return slides
+
+
+def _pack(horiz, vert, ends):
+    """Pack arrays of states into two arrays of keys as in
+    rush_hour.state.pack."""
+    inner = np.uint64(st.INNER_MASK)
+    return (horiz & inner) | ends, (vert & inner) | ends
+
+
+class VectorSolver:
+    """A level-synchronous BFS over NumPy arrays of states"""
+
+    def __init__(self, string_rep):
+        start_state = st.from_string_rep(string_rep)
+        self._slides = _candidate_slides(start_state)
+        self._levels = [(
+            np.array([start_state[1]], dtype=np.uint64),
+            np.array([start_state[2]], dtype=np.uint64),
+            np.array([start_state[3]], dtype=np.uint64),
+            np.array([-1], dtype=np.int64),
+            np.array([0], dtype=np.uint16),
+        )]
+        self.expanded = 0
+        self.states_seen = 1
+
+    def run(self):
+        """Run the solver from the start state."""
+        solved_bit = np.uint64(1 << 30)
+        while len(self._levels[-1][0]):
+            level = self._expand()
+            self._levels.append(level)
+            self.states_seen += len(level[0])
+            solved = np.flatnonzero(level[0] & solved_bit)
+            if len(solved):
+                return self._path(int(solved[0]))
+        return None
+
+    def _expand(self):
+        """Apply every candidate slide to every state of the last level and
+        return the level of new states found this way."""
+        horiz, vert, ends = self._levels[-1][:3]
+        self.expanded += len(horiz)
+        occupied = horiz | vert
+        zero = np.uint64(0)
+        parts = []
+        for (horizontal, piece, end, before, swath, delta, end_delta,
+             move) in self._slides:
+            cells = horiz if horizontal else vert
+            valid = ((cells & piece) == piece) & \
+                ((ends & piece) == end) & \
+                ((cells & ~ends & before) == zero) & \
+                ((occupied & swath) == zero)
+            parents = np.flatnonzero(valid)
+            if not len(parents):
+                continue
+            if horizontal:
+                parts.append((horiz[parents] ^ delta, vert[parents],
+                              ends[parents] ^ end_delta, parents, move))
+            else:
+                parts.append((horiz[parents], vert[parents] ^ delta,
+                              ends[parents] ^ end_delta, parents, move))
+        if not parts:
+            return tuple(np.empty(0, dtype=dtype) for dtype in
+                         (np.uint64, np.uint64, np.uint64, np.int64,
+                          np.uint16))
+        new_horiz = np.concatenate([part[0] for part in parts])
+        new_vert = np.concatenate([part[1] for part in parts])
+        new_ends = np.concatenate([part[2] for part in parts])
+        parents = np.concatenate([part[3] for part in parts])
+        moves = np.concatenate([np.full(len(part[3]), part[4],
+                                        dtype=np.uint16) for part in parts])
+        keep = self._new_states(new_horiz, new_vert, new_ends)
+        return (new_horiz[keep], new_vert[keep], new_ends[keep],
+                parents[keep], moves[keep])
+
+    def _new_states(self, horiz, vert, ends):
+        """Return the indices of the given states that do not belong to the
+        last two levels, keeping only one copy of each state."""
+        old = self._levels[-2:]
+        low, high = _pack(horiz, vert, ends)
+        lows, highs, tags = [low], [high], [np.ones(len(low), dtype=np.int8)]
+        for level in old:
+            old_low, old_high = _pack(*level[:3])
+            lows.append(old_low)
+            highs.append(old_high)
+            tags.append(np.zeros(len(old_low), dtype=np.int8))
+        low = np.concatenate(lows)
+        high = np.concatenate(highs)
+        tag = np.concatenate(tags)
+        order = np.lexsort((tag, low, high))
+        low, high, tag = low[order], high[order], tag[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (low[1:] != low[:-1]) | (high[1:] != high[:-1])
+        return np.sort(order[first & (tag == 1)])
+
+    def _path(self, index):
+        """Reconstruct the sequence of moves that leads from the start state to
+        the state with the given index in the last level."""
+        moves = []
+        for level in reversed(self._levels[1:]):
+            moves.append(int(level[4][index]))
+            index = int(level[3][index])
+        moves.reverse()
+        return moves
@@ -0,0 +1,127 @@
+#!/bin/env python3
+
+
+###############################################################################
+#
+# rush_hour_batch.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the boiler plate code of the batch solver, which
+solves a list of puzzles from the database in parallel.  Puzzles are given on
+the command line as puzzle numbers or as inclusive ranges of puzzle numbers
+such as 1000-1999.  Statistics for every puzzle are written to a CSV file as
+soon as the puzzle is solved, and so is the puzzle's solution, to
+<solution directory>/<puzzle number>.sol.  By default, the most expensive
+puzzles are solved first (see rush_hour.batch).  The makespan, the time from
+the start of the batch until its last puzzle is solved, is reported at the
+end."""
+
+
+import argparse
+import csv
+import os
+import sys
+import time
+from rush_hour import batch, puzzle_db, solver
+from rush_hour_solve import print_solution
+
+
+CSV_FIELDS = ["puzzle", "status", "wall_time", "states", "moves",
+              "peak_rss_kb"]
+
+
+def parse_puzzles(args):
+    """Turn a list of puzzle numbers and ranges of puzzle numbers into the
+    list of puzzle numbers they denote."""
+    numbers = []
+    for arg in args:
+        first, _, last = arg.partition("-")
+        try:
+            if last:
+                numbers.extend(range(int(first), int(last) + 1))
+            else:
+                numbers.append(int(first))
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                "{} is not a puzzle number or range".format(arg)) from None
+    return numbers
+
+
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Solve a batch of Rush Hour puzzles in parallel.")
+    parser.add_argument("puzzles", nargs="+",
+                        help="puzzle numbers or ranges such as 100-199")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes (default: one per "
+                        "core)")
+    parser.add_argument("-s", "--strategy", choices=solver.STRATEGIES,
+                        default="bfs", help="search strategy (default: bfs)")
+    parser.add_argument("-t", "--timeout", type=float, default=None,
+                        help="time limit per puzzle in seconds")
+    parser.add_argument("-m", "--memory", type=int, default=None,
+                        help="memory limit per worker in MB")
+    parser.add_argument("--order", choices=batch.ORDERS,
+                        default=batch.LONGEST_FIRST,
+                        help="dispatch the puzzles in the order given or "
+                        "longest first by estimated cost (default: "
+                        "{})".format(batch.LONGEST_FIRST))
+    parser.add_argument("--database", default=puzzle_db.DEFAULT_PATH,
+                        help="text puzzle database (default: {})".format(
+                            puzzle_db.DEFAULT_PATH))
+    parser.add_argument("-o", "--output", default="batch-stats.csv",
+                        help="CSV file to write statistics to (default: "
+                        "batch-stats.csv)")
+    parser.add_argument("-d", "--solutions", default="solutions",
+                        help="directory to write solutions to (default: "
+                        "solutions)")
+    args = parser.parse_args()
+    try:
+        args.puzzles = parse_puzzles(args.puzzles)
+    except argparse.ArgumentTypeError as error:
+        parser.error(str(error))
+    return args
+
+
+def main():
+    """Main function"""
+    args = parse_args()
+    os.makedirs(args.solutions, exist_ok=True)
+    memory_limit = args.memory << 20 if args.memory else None
+    counts = {}
+    start = time.perf_counter()
+    with open(args.output, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_FIELDS)
+        for (number, puzzle, status, wall_time, states, solution,
+             peak_rss) in batch.run_batch(args.puzzles, args.jobs,
+                                          args.strategy, args.timeout,
+                                          memory_limit, args.database,
+                                          args.order):
+            writer.writerow([number, status, "{:.4f}".format(wall_time),
+                             states, len(solution) if solution else "",
+                             peak_rss])
+            file.flush()
+            if solution:
+                with open(os.path.join(args.solutions,
+                                       "{}.sol".format(number)),
+                          "w") as sol_file:
+                    print_solution(puzzle, solution, sol_file)
+            counts[status] = counts.get(status, 0) + 1
+            print("{:>8}  {:14}  {:8.3f}s".format(number, status, wall_time),
+                  file=sys.stderr)
+    print(", ".join("{} {}".format(count, status)
+                    for (status, count) in sorted(counts.items())),
+          file=sys.stderr)
+    print("Makespan: {:.3f}s ({} order)".format(
+        time.perf_counter() - start, args.order), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,671 @@
+#!/bin/env python3
+
+
+###############################################################################
+#
+# rush_hour_bench.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides a collection of small benchmarks of the puzzle solver.
+Each benchmark is run on a list of puzzles given on the command line, either as
+puzzle numbers in the database or as 36-character board strings.  If no
+puzzles are given, a small built-in sample is used."""
+
+
+from concurrent.futures import ProcessPoolExecutor
+import heapq
+from io import StringIO
+import os
+import sys
+import time
+import tracemalloc
+import rush_hour.state as st
+from rush_hour import batch, cluster, estimate, informed, pattern, solver
+from rush_hour.puzzle_db import PuzzleDB
+from rush_hour.samples import LARGE_PUZZLES, SAMPLE_PUZZLES
+from rush_hour.stats import SearchStats
+from rush_hour.table import StateTable
+from rush_hour_solve import load_puzzle
+
+
+def usage():
+    """Print a usage message and exit when incorrect command line arguments
+    were given."""
+    print("USAGE: {} <benchmark> [<puzzle number or board> ...]".format(
+        sys.argv[0]))
+    print("Benchmarks: {}".format(", ".join(sorted(BENCHMARKS))))
+    sys.exit(1)
+
+
+def load_puzzles(args, default=SAMPLE_PUZZLES):
+    """Turn the command line arguments into a list of puzzles.  Arguments that
+    are 36 characters long are taken to be boards.  All other arguments are
+    taken to be puzzle numbers.  If there are no arguments, the given default
+    list of puzzles is used."""
+    if not args:
+        return default
+    puzzles = []
+    for arg in args:
+        if len(arg) == 36:
+            puzzles.append(arg)
+        else:
+            try:
+                puzzles.append(load_puzzle(int(arg)))
+            except ValueError:
+                usage()
+    return puzzles
+
+
+def bench_memory(puzzles):
+    """Report the peak memory used by the BFS solver on each puzzle, along with
+    the number of states it discovered and the resulting cost per state."""
+    print("{:36}  {:>5}  {:>8}  {:>10}  {:>9}  {:>8}".format(
+        "Puzzle", "Moves", "States", "Peak (kB)", "B/state", "Time (s)"))
+    for puzzle in puzzles:
+        tracemalloc.start()
+        start = time.perf_counter()
+        search = solver._Solver(puzzle)
+        solution = search.run()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        states = search.states_seen
+        print("{:36}  {:>5}  {:>8}  {:>10.1f}  {:>9.1f}  {:>8.3f}".format(
+            puzzle, len(solution) if solution else "-", states, peak / 1024,
+            peak / states, elapsed))
+
+
+def bench_vector(puzzles):
+    """Compare the number of states per second the NumPy BFS engine discovers
+    with the number of states per second the pure-Python BFS engine discovers.
+    By default, this benchmark uses puzzles with large clusters, because the
+    NumPy engine pays off only for large BFS levels."""
+    if "numpy" not in solver.STRATEGIES:
+        print("ERROR: The NumPy engine requires NumPy")
+        sys.exit(1)
+    print("{:36}  {:>8}  {:>5}  {:>8}  {:>8}  {:>10}".format(
+        "Puzzle", "Strategy", "Moves", "States", "Time (s)", "States/s"))
+    for puzzle in puzzles:
+        for strategy in ("bfs", "numpy"):
+            start = time.perf_counter()
+            search = solver.make_solver(puzzle, strategy)
+            solution = search.run()
+            elapsed = time.perf_counter() - start
+            print("{:36}  {:>8}  {:>5}  {:>8}  {:>8.3f}  {:>10.0f}".format(
+                puzzle, strategy, len(solution) if solution else "-",
+                search.states_seen, elapsed, search.states_seen / elapsed))
+
+
+def bench_parallel(puzzles):
+    """Measure how the running time of the parallel BFS scales with the
+    number of worker processes, compared with the serial BFS.  By default,
+    this benchmark uses puzzles with large clusters, because the workers are
+    kept busy only by large BFS levels."""
+    print("{:36}  {:>7}  {:>5}  {:>8}  {:>8}  {:>7}".format(
+        "Puzzle", "Workers", "Moves", "States", "Time (s)", "Speedup"))
+    for puzzle in puzzles:
+        start = time.perf_counter()
+        solution = solver.run(puzzle)
+        serial_time = time.perf_counter() - start
+        print("{:36}  {:>7}  {:>5}  {:>8}  {:>8.3f}  {:>7.2f}".format(
+            puzzle, "serial", len(solution) if solution else "-", "-",
+            serial_time, 1.0))
+        for workers in (1, 2, 4, 8):
+            start = time.perf_counter()
+            search = solver.make_solver(puzzle, "parallel", workers=workers)
+            solution = search.run()
+            elapsed = time.perf_counter() - start
+            print("{:36}  {:>7}  {:>5}  {:>8}  {:>8.3f}  {:>7.2f}".format(
+                puzzle, workers, len(solution) if solution else "-",
+                search.states_seen, elapsed, serial_time / elapsed))
+
+
+def bench_visited(puzzles):
+    """Compare the memory needed to hold the entire cluster of states
+    reachable from each puzzle in a set of state tuples with the memory needed
+    to hold it in a StateTable of packed states."""
+    print("{:36}  {:>8}  {:>12}  {:>12}  {:>6}".format(
+        "Puzzle", "States", "Tuples (kB)", "Table (kB)", "Ratio"))
+    for puzzle in puzzles:
+        start_state = st.from_string_rep(puzzle)
+        states, tuple_peak = _traced(_explore_tuples, start_state)
+        _, table_peak = _traced(_explore_table, start_state)
+        print("{:36}  {:>8}  {:>12.1f}  {:>12.1f}  {:>6.1f}".format(
+            puzzle, states, tuple_peak / 1024, table_peak / 1024,
+            tuple_peak / table_peak))
+
+
+def _traced(func, *args):
+    """Call func on the given arguments and return its result along with the
+    peak amount of memory allocated during the call."""
+    tracemalloc.start()
+    result = func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def _explore_tuples(start_state):
+    """Explore the cluster containing the given state, holding the visited
+    states in a set of state tuples and the frontier in lists."""
+    seen = {start_state}
+    current = [start_state]
+    while current:
+        next_level = []
+        for state in current:
+            for next_state, _ in solver._Solver._moves(state):
+                if next_state not in seen:
+                    seen.add(next_state)
+                    next_level.append(next_state)
+        current = next_level
+    return len(seen)
+
+
+def _explore_table(start_state):
+    """Explore the cluster containing the given state, holding the visited
+    states in a StateTable that doubles as the frontier queue."""
+    seen = StateTable()
+    seen.add(st.pack(start_state))
+    _explore(seen)
+    return len(seen)
+
+
+def _explore(seen):
+    """Add all states reachable from the states in the given table to the
+    table."""
+    index = 0
+    while index < len(seen):
+        for next_state, move in solver._Solver._moves(
+                st.unpack(seen.key(index))):
+            seen.add(st.pack(next_state), index, move)
+        index += 1
+
+
+def bench_stats(puzzles):
+    """Measure the cost of collecting search statistics.  Each puzzle is
+    solved by the uninstrumented BFS loop, by the BFS solver without
+    statistics, and by the BFS solver collecting statistics, taking the best
+    of several runs.  The overheads are relative to the uninstrumented
+    loop."""
+    repeats = 5
+    print("{:36}  {:>10}  {:>10}  {:>10}  {:>8}  {:>8}".format(
+        "Puzzle", "Plain (s)", "Off (s)", "On (s)", "Off (%)", "On (%)"))
+    for puzzle in puzzles:
+        plain = _best_time(
+            lambda: _reference_run(solver._Solver(puzzle)), repeats)
+        off = _best_time(lambda: solver._Solver(puzzle).run(), repeats)
+        on = _best_time(
+            lambda: solver._Solver(puzzle, SearchStats()).run(), repeats)
+        print("{:36}  {:>10.4f}  {:>10.4f}  {:>10.4f}  {:>8.1f}  "
+              "{:>8.1f}".format(puzzle, plain, off, on,
+                                100 * (off / plain - 1),
+                                100 * (on / plain - 1)))
+
+
+def _best_time(func, repeats):
+    """Return the shortest of repeats running times of func."""
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _reference_run(search):
+    """The BFS loop of the solver without support for statistics.  It is
+    kept as a reference for bench_stats."""
+    start, end = 0, len(search._seen)
+    while start < end:
+        for index in range(start, end):
+            sol = search._search(index)
+            if sol:
+                return sol
+        start, end = end, len(search._seen)
+    return None
+
+
+def bench_parse(puzzles):
+    """Measure how many boards per second the original board parser, the
+    current parser, and the bulk parser turn into states.  The given puzzles
+    are repeated to make up 20000 boards."""
+    boards = (puzzles * (20000 // len(puzzles) + 1))[:20000]
+    reference_rate = _parse_rate(
+        lambda: [_reference_from_string_rep(board) for board in boards],
+        len(boards))
+    single_rate = _parse_rate(
+        lambda: [st.from_string_rep(board) for board in boards], len(boards))
+    bulk_rate = _parse_rate(lambda: list(st.from_string_reps(boards)),
+                            len(boards))
+    print("{:8}  {:>12}  {:>7}".format("Parser", "Boards/s", "Speedup"))
+    for (name, rate) in (("original", reference_rate),
+                         ("single", single_rate), ("bulk", bulk_rate)):
+        print("{:8}  {:>12.0f}  {:>7.2f}".format(name, rate,
+                                               rate / reference_rate))
+
+
+def _parse_rate(func, count):
+    """Return the number of boards per second parsed by func, which parses
+    count boards."""
+    start = time.perf_counter()
+    func()
+    return count / (time.perf_counter() - start)
+
+
+def _reference_from_string_rep(string_rep):
+    """The original parser, which pads the board using print and StringIO
+    and visits all 64 cells twice.  It is kept as a reference for
+    bench_parse."""
+    grid = _reference_grid(string_rep)
+    horiz, horiz_ends = _reference_horiz_pieces(grid)
+    vert, vert_ends = _reference_vert_pieces(grid)
+    occupied = vert | horiz
+    ends = horiz_ends | vert_ends
+    return (occupied, horiz, vert, ends)
+
+
+def _reference_grid(string_rep):
+    """Pad a 36-character string representation of a state into a 64-character
+    representation that includes empty cells to represent the borders around
+    the board."""
+    grid = StringIO()
+    print("oooooooo", file=grid, end="")
+    for i in range(6):
+        print("o{}o".format(string_rep[6*i:6*(i+1)]), file=grid, end="")
+    print("oooooooo", file=grid, end="")
+    return grid.getvalue()
+
+
+def _reference_vert_pieces(grid):
+    """Find all vertical pieces on the board and return two words representing
+    the cells occupied by these pieces and the cells that are the bottommost
+    cells of these pieces."""
+    transposed_grid = _reference_transpose_grid(grid)
+    transposed_bits, transposed_ends = \
+        _reference_horiz_pieces(transposed_grid)
+    return _reference_transpose_bits(transposed_bits), \
+        _reference_transpose_bits(transposed_ends)
+
+
+def _reference_horiz_pieces(grid):
+    """Find all horizontal pieces on the board and return two words
+    representing the cells occupied by these pieces and the cells that are the
+    rightmost cells of these pieces."""
+    bits = 0xff000000000000ff
+    ends = 0
+    for i in range(64):
+        cellbit, cellend = _reference_horiz_bits(grid, i)
+        bits |= cellbit
+        ends |= cellend
+    return bits, ends
+
+
+def _reference_horiz_bits(grid, pos):
+    """Return a pair of words representing position pos on the board.  The
+    first word is 1 << pos if the position is occupied and 0 otherwise.  The
+    second word is 1 << pos if the position is the rightmost position of a
+    piece and 0 otherwise."""
+    if grid[pos] == "o":
+        return 0, 0
+    if grid[pos] == grid[pos+1]:
+        return 1 << pos, 0
+    if grid[pos] == grid[pos-1]:
+        return 1 << pos, 1 << pos
+    else:
+        return 0, 0
+
+
+def _reference_transpose_grid(grid):
+    """Rearranges the character in a 64-character string represending an 8x8
+    Rush Hour board so as to transpose the board."""
+    transposed_grid = StringIO()
+    for i in range(64):
+        j = ((i & 7) << 3) | ((i & 56) >> 3)
+        print(grid[j], file=transposed_grid, end="")
+    return transposed_grid.getvalue()
+
+
+def _reference_transpose_bits(bits):
+    """Rearranges the bits in a 64-bit bit string representing an 8x8 board so
+    as to transpose the board."""
+    # 2x2 transpose of individual bits
+    trans = (bits ^ (bits << 7)) & 0x5500550055005500
+    bits = bits ^ trans ^ (trans >> 7)
+    # 2x2 transpose of 2x2 blocks
+    trans = (bits ^ (bits << 14)) & 0x3333000033330000
+    bits = bits ^ trans ^ (trans >> 14)
+    # 2x2 transpose of 4x4 blocks
+    trans = (bits ^ (bits << 28)) & 0x0f0f0f0f00000000
+    bits = bits ^ trans ^ (trans >> 28)
+    return bits
+
+
+def bench_strategies(puzzles):
+    """Report the number of states each solver strategy expands on each puzzle,
+    along with the length of the solution it finds and its running time."""
+    print("{:36}  {:>8}  {:>5}  {:>8}  {:>8}".format(
+        "Puzzle", "Strategy", "Moves", "Expanded", "Time (s)"))
+    for puzzle in puzzles:
+        for strategy in solver.STRATEGIES:
+            start = time.perf_counter()
+            search = solver.make_solver(puzzle, strategy)
+            solution = search.run()
+            elapsed = time.perf_counter() - start
+            print("{:36}  {:>8}  {:>5}  {:>8}  {:>8.3f}".format(
+                puzzle, strategy, len(solution) if solution else "-",
+                search.expanded, elapsed))
+
+
+def bench_cluster(puzzles):
+    """Compare the time needed to build the distance table of each puzzle's
+    cluster with the time needed to solve the puzzle from the table once it
+    has been built.  The tables are built in memory and not stored."""
+    print("{:36}  {:>8}  {:>9}  {:>10}  {:>10}".format(
+        "Puzzle", "States", "Build (s)", "Solve (us)", "BFS (s)"))
+    for puzzle in puzzles:
+        state = st.from_string_rep(puzzle)
+        start = time.perf_counter()
+        table = cluster.ClusterTable.build(state)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        table.solve(state)
+        solve_time = time.perf_counter() - start
+        start = time.perf_counter()
+        solver.run(puzzle)
+        bfs_time = time.perf_counter() - start
+        print("{:36}  {:>8}  {:>9.3f}  {:>10.1f}  {:>10.3f}".format(
+            puzzle, len(table), build_time, solve_time * 1e6, bfs_time))
+
+
+def bench_pattern(puzzles):
+    """Report the size and build time of the pattern database and how tight
+    the heuristics are on each puzzle.  For each heuristic, the table lists
+    the estimate for the puzzle, the ratio of estimated to actual distance
+    averaged over the unsolved states of the puzzle's cluster, and the number
+    of states A* expands using the heuristic.  The pattern database is built
+    in memory, stored at its default path if it is not there yet, and then
+    loaded from there."""
+    start = time.perf_counter()
+    table = pattern.PatternTable.build()
+    build_time = time.perf_counter() - start
+    print("Entries           =", len(table))
+    print("Size (bytes)      =", len(table) // 2)
+    print("Build time (s)    = {:.1f}".format(build_time))
+    print("Hardest (moves)   =", table.moves)
+    if not os.path.exists(pattern.DEFAULT_PATH):
+        table.save()
+    print()
+    print("{:36}  {:>5}  {:>9}  {:>5}  {:>5}  {:>8}".format(
+        "Puzzle", "Moves", "Heuristic", "Start", "Ratio", "Expanded"))
+    for puzzle in puzzles:
+        seen = cluster.explore(st.from_string_rep(puzzle))
+        distances, _ = cluster.solve_distances(seen)
+        states = [(st.unpack(seen.key(index)), dist)
+                  for (index, dist) in enumerate(distances)
+                  if 0 < dist < cluster.UNREACHABLE]
+        moves = len(solver.run(puzzle))
+        for name in ("blockers", "blockers2", "pattern"):
+            heuristic = informed.HEURISTICS[name]
+            ratio = sum(heuristic(state) / dist
+                        for (state, dist) in states) / len(states)
+            search = solver.make_solver(puzzle, "astar", heuristic=name)
+            search.run()
+            print("{:36}  {:>5}  {:>9}  {:>5}  {:>5.2f}  {:>8}".format(
+                puzzle, moves, name, heuristic(st.from_string_rep(puzzle)),
+                ratio, search.expanded))
+
+
+def bench_schedule(puzzles):
+    """Compare longest-first dispatch of a batch of puzzles, ordered by the
+    estimates of rush_hour.estimate, with dispatch in the order given.  The
+    table lists each puzzle's estimated cost, the time needed to estimate it,
+    and the number of states and time the BFS needs to solve it.  The batch
+    is then solved in both orders by a pool of one worker process per core,
+    and the makespans are reported.  Since they depend on the number of
+    cores, the makespans of both orders on 2, 4, and 8 workers are also
+    computed by dispatching the measured solving times in the same way as
+    the pool, and compared with the lower bound given by the longest puzzle
+    and by the total time divided by the number of workers.  By default, the
+    large puzzles come last, which is the worst case for dispatch in the order
+    given."""
+    print("{:36}  {:>8}  {:>12}  {:>8}  {:>8}".format(
+        "Puzzle", "Estimate", "Probe (ms)", "States", "Time (s)"))
+    costs, times = [], []
+    with PuzzleDB() as database:
+        for puzzle in puzzles:
+            start = time.perf_counter()
+            costs.append(estimate.estimate(puzzle, database))
+            probe_time = time.perf_counter() - start
+            start = time.perf_counter()
+            search = solver.make_solver(puzzle)
+            search.run()
+            times.append(time.perf_counter() - start)
+            print("{:36}  {:>8}  {:>12.2f}  {:>8}  {:>8.3f}".format(
+                puzzle, costs[-1], probe_time * 1e3, search.states_seen,
+                times[-1]))
+    given = list(range(len(puzzles)))
+    longest = sorted(given, key=lambda index: -costs[index])
+    print()
+    workers = os.cpu_count()
+    for (name, order) in (("given", given), ("longest", longest)):
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for _ in executor.map(batch.solve_board,
+                                  [puzzles[index] for index in order]):
+                pass
+        print("Makespan on {} workers, {:7} order (s) = {:.3f}".format(
+            workers, name, time.perf_counter() - start))
+    print()
+    print("{:>7}  {:>10}  {:>12}  {:>11}".format(
+        "Workers", "Given (s)", "Longest (s)", "Bound (s)"))
+    for workers in (2, 4, 8):
+        print("{:>7}  {:>10.3f}  {:>12.3f}  {:>11.3f}".format(
+            workers, _makespan([times[index] for index in given], workers),
+            _makespan([times[index] for index in longest], workers),
+            max(max(times), sum(times) / workers)))
+
+
+def _makespan(times, workers):
+    """Return the time needed to run jobs with the given running times on the
+    given number of workers, each job starting on the first idle worker in
+    the order given."""
+    finish = [0.0] * workers
+    for job_time in times:
+        heapq.heapreplace(finish, finish[0] + job_time)
+    return max(finish)
+
+
+def bench_successors(puzzles):
+    """Measure how many successor states per second the move generator
+    produces, compared with the original generator that scans all 64 cells.
+    Both generators are run over every state of the cluster reachable from
+    each puzzle."""
+    print("{:36}  {:>8}  {:>12}  {:>12}  {:>7}".format(
+        "Puzzle", "States", "Scan (1/s)", "Pieces (1/s)", "Speedup"))
+    for puzzle in puzzles:
+        seen = StateTable()
+        seen.add(st.pack(st.from_string_rep(puzzle)))
+        _explore(seen)
+        states = [st.unpack(seen.key(index)) for index in range(len(seen))]
+        scan_rate = _successor_rate(_scan_successors, states)
+        piece_rate = _successor_rate(st.successors, states)
+        print("{:36}  {:>8}  {:>12.0f}  {:>12.0f}  {:>7.2f}".format(
+            puzzle, len(states), scan_rate, piece_rate,
+            piece_rate / scan_rate))
+
+
+def bench_tables(puzzles):
+    """Measure the time needed to build the slide tables used by the move
+    generator, which is paid once when rush_hour.state is imported.  The
+    puzzles are ignored."""
+    del puzzles
+    repeats = 20
+    start = time.perf_counter()
+    for _ in range(repeats):
+        st.build_slide_tables()
+    elapsed = (time.perf_counter() - start) / repeats
+    print("Slide tables built in {:.3f} ms".format(elapsed * 1000))
+
+
+def _successor_rate(generator, states):
+    """Return the number of successors per second the given move generator
+    produces for the given list of states."""
+    count = 0
+    start = time.perf_counter()
+    for state in states:
+        for _ in generator(state):
+            count += 1
+    return count / (time.perf_counter() - start)
+
+
+def _reference_vertical_move(state, pos, offset):
+    """Move the vertical piece occupying position pos by offset positions.  A
+    negative offset means move up.  A positive offset means move down.  The
+    return value is the new state and a representation of the move as a 16-bit
+    word.  If the move is invalid because it moves the piece off the board or
+    across another piece, two None values are returned."""
+    stop = state[0] & \
+        (state[1] ^ 0xffffffffffffffff) & \
+        (state[3] ^ 0xffffffffffffffff)
+    return _reference_move(state, pos, offset, stop, 8, 0x0101010101010101)
+
+
+def _reference_horizontal_move(state, pos, offset):
+    """Move the horizontal piece occupying position pos by offset positions.  A
+    negative offset means move left.  A positive offset means move right.  The
+    return value is the new state and a representation of the move as a 16-bit
+    word.  If the move is invalid because it moves the piece off the board or
+    across another piece, two None values are returned."""
+    stop = state[0] & \
+        (state[2] ^ 0xffffffffffffffff) & \
+        (state[3] ^ 0xffffffffffffffff)
+    return _reference_move(state, pos, offset, stop, 1, 0xffffffffffffffff)
+
+
+def _reference_move(state, pos, offset, stop, skip, mask):
+    """This is the worker that implements both horizontal and vertical
+    moves of the reference move generator."""
+
+    # Construct the bit vector representing the positions occupied by the piece
+    # to be moved
+    piece = 1 << pos
+    left = piece >> skip
+    while stop & left:
+        piece |= left
+        left >>= skip
+
+    # Construct the new piece resulting from the move and
+    # - the leftmost and rightmost of piece and new_piece
+    # - the end positions of the leftmost and rightmost pieces
+    if offset < 0:
+        new_piece = piece >> (-offset * skip)
+        left, right = new_piece, piece
+        left_pos, right_pos = pos + offset * skip, pos
+    else:
+        new_piece = piece << (offset * skip)
+        left, right = piece, new_piece
+        left_pos, right_pos = pos, pos + offset * skip
+
+    # Abort if the new piece is out of bounds
+    if left_pos < 9 + skip or right_pos > 54:
+        return None
+
+    # Construct the swath of cells over which the piece moves from its old to
+    # its new position.
+    left = left | (mask << left_pos)
+    right = right | (mask >> (64 - right_pos - skip))
+    swath = (left & right) ^ piece
+
+    # Abort if any of them is occupied.
+    if state[0] & swath:
+        return None
+
+    # Construct the change in occupied cells and the change in end cells
+    # resulting from the move
+    piece_delta = piece ^ new_piece
+    end_delta = (1 << pos) | (1 << (pos + offset * skip))
+
+    # Update occupied, horiz, and end if this was a horizontal move.
+    # Otherwise, update, occupied, vert, and end.
+    if skip == 1:
+        return (
+            state[0] ^ piece_delta,
+            state[1] ^ piece_delta,
+            state[2],
+            state[3] ^ end_delta
+        )
+    return (
+        state[0] ^ piece_delta,
+        state[1],
+        state[2] ^ piece_delta,
+        state[3] ^ end_delta
+    )
+
+
+def _scan_successors(state):
+    """The original move generator, which visits all 64 cells and applies
+    each move separately.  It is kept as a reference for bench_successors."""
+    for pos in range(64):
+        if st.is_end(state, pos):
+            if st.is_horizontal(state, pos):
+                for k in range(1, 5):
+                    new_state = _reference_horizontal_move(state, pos, k)
+                    if not new_state:
+                        break
+                    yield (new_state, st.make_move(pos, k))
+                for k in range(1, 5):
+                    new_state = _reference_horizontal_move(state, pos, -k)
+                    if not new_state:
+                        break
+                    yield (new_state, st.make_move(pos, -k))
+            if st.is_vertical(state, pos):
+                for k in range(1, 5):
+                    new_state = _reference_vertical_move(state, pos, k)
+                    if not new_state:
+                        break
+                    yield (new_state, st.make_move(pos, k))
+                for k in range(1, 5):
+                    new_state = _reference_vertical_move(state, pos, -k)
+                    if not new_state:
+                        break
+                    yield (new_state, st.make_move(pos, -k))
+
+
+BENCHMARKS = {
+    "cluster": bench_cluster,
+    "memory": bench_memory,
+    "parallel": bench_parallel,
+    "parse": bench_parse,
+    "pattern": bench_pattern,
+    "schedule": bench_schedule,
+    "stats": bench_stats,
+    "strategies": bench_strategies,
+    "successors": bench_successors,
+    "tables": bench_tables,
+    "vector": bench_vector,
+    "visited": bench_visited,
+}
+
+
+def main():
+    """Main function"""
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        usage()
+    if sys.argv[1] in ("parallel", "vector"):
+        default = LARGE_PUZZLES
+    elif sys.argv[1] == "schedule":
+        default = SAMPLE_PUZZLES + LARGE_PUZZLES
+    else:
+        default = SAMPLE_PUZZLES
+    BENCHMARKS[sys.argv[1]](load_puzzles(sys.argv[2:], default))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,61 +13,61 @@
 
 """This module provides all the boiler plate code of the solution checker.
 This includes processing of command line arguments, parsing the solution file,
-and pretty-printing the solution to stdout."""
+and pretty-printing the solution to stdout.  If it is given a directory
+instead of a solution file, it checks all solution files in the directory in
+parallel, pretty-prints the states of invalid solutions only, and prints a
+summary of how many solutions were optimal, valid, and invalid."""
 
 
-import re
+import argparse
+import os
 import sys
 import rush_hour.state as st
+from rush_hour import check
+from rush_hour.puzzle_db import DEFAULT_PATH, PuzzleDB
 
 
-def usage():
-    """Print a usage message and exit when incorrect command line arguments
-    were given."""
-    print("USAGE: {} <solution file>".format(sys.argv[0]))
-    sys.exit(1)
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Check a Rush Hour solution file or a directory of "
+        "solution files.")
+    parser.add_argument("path", help="solution file or directory")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes for directories "
+                        "(default: one per core)")
+    parser.add_argument("--database", default=DEFAULT_PATH,
+                        help="text puzzle database (default: {})".format(
+                            DEFAULT_PATH))
+    return parser.parse_args()
 
 
 def load_solution(filename):
     """Load a solution from the given file"""
     with open(filename, "r") as file:
-        puzzle = next(file)
-        if not puzzle:
-            print("ERROR: File {} is empty".format(filename))
-            sys.exit(1)
-        puzzle = puzzle.strip()
-        if len(puzzle) != 36:
-            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-            print("!!! THE PUZZLE GIVEN IN THE SOLUTION IS NOT A VALID PUZZLE !!!")
-            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        try:
+            return check.parse_solution(file)
+        except ValueError as error:
+            banner(str(error))
             sys.exit(1)
-        moves = []
-        for move in file:
-            match = re.match(r"\((\d),(\d)\)([+-]\d)$", move)
-            if not match:
-                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                print("!!! {} IS NOT A VALID MOVE DESCRIPTOR !!!".format(move))
-                print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-                sys.exit(1)
-            row = int(match[1])
-            col = int(match[2])
-            pos = (row << 3) + col
-            offset = int(match[3])
-            moves.append((pos << 8) + offset + 4)
-    return puzzle, moves
-
-
-def load_puzzle_info(puzzle):
+
+
+def banner(message):
+    """Print the given message in upper case, framed by exclamation marks."""
+    message = "!!! {} !!!".format(message.upper())
+    print("!" * len(message))
+    print(message)
+    print("!" * len(message))
+
+
+def load_puzzle_info(puzzle, path=DEFAULT_PATH):
     """Load the number of optimal moves and the size of the search space for
     the given puzzle."""
-    with open("../rush_no_walls.txt", "r") as file:
-        for line in file:
-            fields = line.split()
-            if fields[1] == puzzle:
-                return int(fields[0]), int(fields[2])
-    print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-    print("!!! THE PUZZLE GIVEN IN THE SOLUTION IS NOT A VALID PUZZLE !!!")
-    print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+    with PuzzleDB(path) as database:
+        info = database.lookup(puzzle)
+    if info:
+        return info[1], info[2]
+    banner("The puzzle given in the solution is not a valid puzzle")
     sys.exit(1)
 
 
@@ -82,20 +82,12 @@ def construct_state_seq(solution):
         if state:
             states.append(state)
         else:
-            pos = move >> 8
-            row = pos >> 3
-            col = pos & 7
-            offset = (move & 0xff) - 4
-            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-            print("!!! INVALID MOVE ({},{}){:+} !!!".format(row, col, offset))
-            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+            banner("Invalid move {}".format(check.format_move(move)))
             print("State sequence so far:")
             print_solution(states)
             sys.exit(1)
     if not st.is_solved(states[-1]):
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-        print("!!! FINAL STATE IS NOT SOLVED !!!")
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        banner("Final state is not solved")
         print("State sequence so far:")
         print_solution(states)
         sys.exit(1)
@@ -117,12 +109,48 @@ def print_solution(state_seq):
             print()
 
 
+def check_directory(args):
+    """Check all solution files in the given directory and print a summary.
+    Return the number of solutions that are not optimal."""
+    counts = dict.fromkeys(check.STATUSES, 0)
+    for (path, status, puzzle, moves, optimal_moves, applied,
+         message) in check.check_directory(args.path, args.jobs,
+                                           args.database):
+        counts[status] += 1
+        if status == check.INVALID:
+            print("{}: {}".format(path, message))
+            if puzzle:
+                print_solution(construct_state_prefix(puzzle, moves,
+                                                      applied))
+            print()
+        elif status == check.VALID:
+            print("{}: {} moves instead of {}".format(path, len(moves),
+                                                      optimal_moves))
+        elif status == check.UNKNOWN:
+            print("{}: Puzzle is not in the database".format(path))
+    print("{:14}  {:>6}".format("Status", "Files"))
+    for status in check.STATUSES:
+        print("{:14}  {:>6}".format(status, counts[status]))
+    print("{:14}  {:>6}".format("total", sum(counts.values())))
+    return sum(counts.values()) - counts[check.OPTIMAL]
+
+
+def construct_state_prefix(puzzle, moves, applied):
+    """Construct the sequence of states obtained by applying the first
+    applied moves to the start state of the given puzzle."""
+    states = [st.from_string_rep(puzzle)]
+    for move in moves[:applied]:
+        states.append(st.apply_move(states[-1], move))
+    return states
+
+
 def main():
     """Main function"""
-    if len(sys.argv) != 2:
-        usage()
-    solution = load_solution(sys.argv[1])
-    moves, space = load_puzzle_info(solution[0])
+    args = parse_args()
+    if os.path.isdir(args.path):
+        sys.exit(1 if check_directory(args) else 0)
+    solution = load_solution(args.path)
+    moves, space = load_puzzle_info(solution[0], args.database)
     print("Optimal moves     =", moves)
     print("Moves in solution =", len(solution[1]))
     print("Search space size =", space)
@@ -131,9 +159,7 @@ def main():
         print("The computed solution is optimal.")
         print_solution(state_seq)
     else:
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-        print("!!! THE COMPUTED SOLUTION IS NOT OPTIMAL !!!")
-        print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
+        banner("The computed solution is not optimal")
         print_solution(state_seq)
         sys.exit(1)
 
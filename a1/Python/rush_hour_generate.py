@@ -0,0 +1,76 @@
+#!/bin/env python3
+
+
+###############################################################################
+#
+# rush_hour_generate.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the boiler plate code of the database generator.  It
+generates the puzzles of all units of work not checkpointed yet in parallel,
+reporting progress to stderr, and then merges the checkpoints into a text
+database and builds its index.  An interrupted run is resumed by running the
+same command again."""
+
+
+import argparse
+import sys
+import time
+from rush_hour import generate
+
+
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Generate the Rush Hour puzzle database.")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes (default: one per "
+                        "core)")
+    parser.add_argument("-p", "--max-pieces", type=int, default=None,
+                        help="generate only puzzles with at most this many "
+                        "pieces, including the red car (default: no limit)")
+    parser.add_argument("-d", "--checkpoints",
+                        default=generate.DEFAULT_DIRECTORY,
+                        help="directory of checkpoints (default: {})".format(
+                            generate.DEFAULT_DIRECTORY))
+    parser.add_argument("-o", "--output", default="../rush_generated.txt",
+                        help="text database to write; its index is written "
+                        "next to it (default: ../rush_generated.txt)")
+    args = parser.parse_args()
+    if args.max_pieces is not None and args.max_pieces < 1:
+        parser.error("--max-pieces must be at least 1")
+    return args
+
+
+def main():
+    """Main function"""
+    args = parse_args()
+    start = time.perf_counter()
+    total = len(generate.units(args.max_pieces))
+    done = total - len(generate.pending_units(args.checkpoints,
+                                              args.max_pieces))
+    puzzles = 0
+    try:
+        for (_, count) in generate.generate(args.checkpoints,
+                                            args.max_pieces, args.jobs):
+            done += 1
+            puzzles += count
+            print("\r{}/{} units, {} new puzzles".format(done, total,
+                                                       puzzles),
+                  end="", file=sys.stderr)
+        print(file=sys.stderr)
+        count = generate.merge(args.checkpoints, args.output)
+    except ValueError as error:
+        print("ERROR: {}".format(error))
+        sys.exit(1)
+    print("Generated {} puzzles into {} in {:.1f}s".format(
+        count, args.output, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/bin/env python3
+
+
+###############################################################################
+#
+# rush_hour_index.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module converts the text puzzle database into the indexed binary
+database used by rush_hour.puzzle_db.PuzzleDB.  This needs to be done only
+once, and again whenever the text database changes."""
+
+
+import sys
+import time
+from rush_hour import puzzle_db
+
+
+def usage():
+    """Print a usage message and exit when incorrect command line arguments
+    were given."""
+    print("USAGE: {} [<text database> [<binary database>]]".format(
+        sys.argv[0]))
+    sys.exit(1)
+
+
+def main():
+    """Main function"""
+    if len(sys.argv) > 3:
+        usage()
+    path = sys.argv[1] if len(sys.argv) > 1 else puzzle_db.DEFAULT_PATH
+    db_path = sys.argv[2] if len(sys.argv) > 2 else puzzle_db.index_path(path)
+    start = time.perf_counter()
+    count = puzzle_db.build_index(path, db_path)
+    print("Indexed {} puzzles into {} in {:.1f}s".format(
+        count, db_path, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/bin/env python3
+
+
+###############################################################################
+#
+# rush_hour_server.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the boiler plate code of the solve server.  The serve
+command runs the server until it is interrupted.  The load command sends a
+number of requests to a running server from a number of concurrent clients
+and reports the distribution of the latencies of the answers."""
+
+
+import argparse
+import asyncio
+import sys
+import time
+from rush_hour import puzzle_db, samples, server, solver
+
+
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Run or measure the Rush Hour solve server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the solve server")
+    serve.add_argument("-a", "--address", default=server.DEFAULT_ADDRESS,
+                       help="Unix socket path or host:port to listen on "
+                       "(default: {})".format(server.DEFAULT_ADDRESS))
+    serve.add_argument("-j", "--jobs", type=int, default=None,
+                       help="number of worker processes (default: one per "
+                       "core)")
+    serve.add_argument("-t", "--max-timeout", type=float,
+                       default=server.DEFAULT_TIMEOUT,
+                       help="maximum time budget per request in seconds "
+                       "(default: {:g})".format(server.DEFAULT_TIMEOUT))
+    serve.add_argument("-m", "--memory", type=int, default=None,
+                       help="memory limit per worker in MB")
+    serve.add_argument("--database", default=puzzle_db.DEFAULT_PATH,
+                       help="text puzzle database (default: {})".format(
+                           puzzle_db.DEFAULT_PATH))
+    serve.add_argument("--cache", metavar="PATH",
+                       help="answer repeated puzzles from the solution cache "
+                       "at this path")
+    load = commands.add_parser("load",
+                               help="measure the latency of a running server")
+    load.add_argument("puzzles", nargs="*",
+                      help="puzzle numbers or boards (default: a built-in "
+                      "sample)")
+    load.add_argument("-a", "--address", default=server.DEFAULT_ADDRESS,
+                      help="address of the server (default: {})".format(
+                          server.DEFAULT_ADDRESS))
+    load.add_argument("-n", "--requests", type=int, default=1000,
+                      help="number of requests (default: 1000)")
+    load.add_argument("-c", "--concurrency", type=int, default=16,
+                      help="number of concurrent clients (default: 16)")
+    load.add_argument("-s", "--strategy", choices=solver.STRATEGIES,
+                      default="bfs", help="search strategy (default: bfs)")
+    return parser.parse_args()
+
+
+def serve(args):
+    """Run the server until it is interrupted."""
+    solve_server = server.SolveServer(args.jobs, args.database, args.cache,
+                                      args.max_timeout,
+                                      args.memory << 20 if args.memory
+                                      else None)
+    try:
+        asyncio.run(solve_server.serve(args.address))
+    finally:
+        solve_server.close()
+        print("Served {} requests".format(solve_server.requests),
+              file=sys.stderr)
+
+
+def load(args):
+    """Send requests to a running server and report their latencies."""
+    puzzles = [puzzle if len(puzzle) == 36 else int(puzzle)
+               for puzzle in args.puzzles] or samples.SAMPLE_PUZZLES
+    start = time.perf_counter()
+    try:
+        latencies, counts = asyncio.run(server.generate_load(
+            args.address, puzzles, args.requests, args.concurrency,
+            args.strategy))
+    except OSError as error:
+        print("ERROR: Cannot connect to {}: {}".format(args.address, error))
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print("Requests          =", len(latencies))
+    print("Answers           =", ", ".join(
+        "{} {}".format(count, status)
+        for (status, count) in sorted(counts.items())))
+    print("Throughput (1/s)  = {:.1f}".format(len(latencies) / elapsed))
+    for (name, fraction) in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        print("Latency {} (ms)  = {:.2f}".format(
+            name, 1000 * server.percentile(latencies, fraction)))
+    print("Latency max (ms)  = {:.2f}".format(1000 * max(latencies)))
+
+
+def main():
+    """Main function"""
+    args = parse_args()
+    if args.command == "serve":
+        serve(args)
+    else:
+        load(args)
+
+
+if __name__ == "__main__":
+    main()
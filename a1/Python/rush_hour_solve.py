@@ -16,57 +16,192 @@ includes processing of command line arguments, loading of the specified puzzle
 from the database, and printing of the computed solution to stdout."""
 
 
+import argparse
+from itertools import islice
 import sys
-from rush_hour import solver
-
-
-def usage():
-    """Print a usage message and exit when incorrect command line arguments
-    were given."""
-    print("USAGE: {} <puzzle number>".format(sys.argv[0]))
-    sys.exit(1)
+import time
+from rush_hour import batch, cache, server, solver
+from rush_hour.optimal import OptimalSolutions
+from rush_hour.stats import SearchStats
+from rush_hour.puzzle_db import PuzzleDB
+
+
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Solve a Rush Hour puzzle from the database.")
+    parser.add_argument("puzzle", type=int, help="puzzle number")
+    parser.add_argument("strategy", nargs="?", default="bfs",
+                        choices=solver.STRATEGIES,
+                        help="search strategy (default: bfs)")
+    parser.add_argument("--budget", type=int, metavar="MB",
+                        help="memory budget of the external strategy in MB")
+    parser.add_argument("--cache", nargs="?", const=cache.DEFAULT_PATH,
+                        metavar="PATH",
+                        help="look up and store solutions in a solution "
+                        "cache (default: {})".format(cache.DEFAULT_PATH))
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="print solution cache statistics to stderr")
+    parser.add_argument("--stats", choices=("text", "json"),
+                        help="print per-level search statistics to stderr "
+                        "(bfs strategy only)")
+    parser.add_argument("--server", nargs="?", const=server.DEFAULT_ADDRESS,
+                        metavar="ADDRESS",
+                        help="send the puzzle to a running solve server at "
+                        "this Unix socket path or host:port (default: "
+                        "{})".format(server.DEFAULT_ADDRESS))
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="give up after this many seconds (bfs strategy "
+                        "only, unless solving on a server)")
+    parser.add_argument("--max-states", type=int, metavar="N",
+                        help="give up after discovering N states (bfs "
+                        "strategy only)")
+    parser.add_argument("--progress", action="store_true",
+                        help="print the progress of the search after every "
+                        "BFS level to stderr (bfs strategy only)")
+    parser.add_argument("--count", action="store_true",
+                        help="print the number of optimal solutions instead "
+                        "of one solution")
+    parser.add_argument("--enumerate", type=int, metavar="N",
+                        help="print up to N optimal solutions instead of one")
+    args = parser.parse_args()
+    args.options = {}
+    if args.server and (args.budget or args.cache or args.stats or
+                        args.max_states is not None or args.progress):
+        parser.error("--server cannot be combined with --budget, --cache, "
+                     "--stats, --max-states, or --progress")
+    if (args.count or args.enumerate is not None) and \
+            (args.server or args.budget or args.cache or args.stats or
+             args.timeout is not None or args.max_states is not None or
+             args.progress):
+        parser.error("--count and --enumerate cannot be combined with "
+                     "--server, --budget, --cache, --stats, --timeout, "
+                     "--max-states, or --progress")
+    if args.budget:
+        if args.strategy != "external":
+            parser.error("--budget requires the external strategy")
+        args.options["budget"] = args.budget << 20
+    if args.stats:
+        if args.strategy != "bfs":
+            parser.error("--stats requires the bfs strategy")
+        args.options["stats"] = SearchStats()
+    if (args.timeout is not None or args.max_states is not None or
+            args.progress) and not args.server:
+        if args.strategy != "bfs":
+            parser.error("--timeout, --max-states, and --progress require "
+                         "the bfs strategy")
+        if args.max_states is not None:
+            args.options["max_states"] = args.max_states
+        if args.progress:
+            args.options["progress"] = print_progress
+    if args.cache_stats and not args.cache:
+        args.cache = cache.DEFAULT_PATH
+    return args
 
 
 def load_puzzle(number):
     """Load the puzzle with the given number from the database and return
     its 36-character representation loaded from the database."""
-    count = 0
-    with open("../rush_no_walls.txt", "r") as file:
-        puzzle = None
-        for line in file:
-            if count == number:
-                fields = line.split()
-                return fields[1]
-            count += 1
-    print("ERROR: There are only {} puzzles".format(count))
-    sys.exit(1)
-
-
-def print_solution(puzzle, solution):
-    """Print the initial state and the sequence of moves to the screen"""
-    print(puzzle)
+    with PuzzleDB() as database:
+        try:
+            return database.puzzle(number)[1]
+        except IndexError:
+            print("ERROR: There are only {} puzzles".format(len(database)))
+            sys.exit(1)
+
+
+def print_solution(puzzle, solution, file=sys.stdout):
+    """Print the initial state and the sequence of moves to the screen, or to
+    the given file"""
+    print(puzzle, file=file)
     for move in solution:
         pos = move >> 8
         row = pos >> 3
         col = pos & 7
         offset = (move & 0xff) - 4
-        print("({},{}){:+}".format(row, col, offset))
+        print("({},{}){:+}".format(row, col, offset), file=file)
+
+
+def print_optimal_solutions(puzzle, args):
+    """Print the number of optimal solutions of the puzzle, or up to the
+    requested number of them, separated by blank lines."""
+    solutions = OptimalSolutions(puzzle)
+    if not solutions.count():
+        print("This puzzle is unsolvable")
+        return
+    if args.count:
+        print("Optimal moves     =", solutions.length)
+        print("Optimal solutions =", solutions.count())
+    if args.enumerate is not None:
+        for (number, solution) in enumerate(islice(solutions,
+                                                   args.enumerate)):
+            if number or args.count:
+                print()
+            print_solution(puzzle, solution)
+
+
+def print_progress(progress):
+    """Print the progress of the search after a BFS level to stderr."""
+    print("Depth {:3}: {:8} states in level, {:9} discovered, {:8.2f}s".format(
+        progress.depth, progress.frontier, progress.states, progress.elapsed),
+          file=sys.stderr)
+
+
+def solve_remotely(args):
+    """Send the puzzle to the solve server and print its answer."""
+    request = {"puzzle": args.puzzle, "strategy": args.strategy}
+    if args.timeout is not None:
+        request["timeout"] = args.timeout
+    try:
+        answer = server.send_request(args.server, request)
+    except OSError as error:
+        print("ERROR: Cannot reach the solve server at {}: {}".format(
+            args.server, error))
+        sys.exit(1)
+    if answer["status"] == batch.SOLVED:
+        print_solution(answer["board"], answer["moves"])
+    elif answer["status"] == batch.UNSOLVABLE:
+        print("This puzzle is unsolvable")
+    else:
+        print("ERROR: {}".format(answer.get("message", answer["status"])))
+        sys.exit(1)
 
 
 def main():
     """Main function"""
-    if len(sys.argv) != 2:
-        usage()
-    try:
-        puzzle_number = int(sys.argv[1])
-    except ValueError:
-        usage()
-    puzzle = load_puzzle(puzzle_number)
-    solution = solver.run(puzzle)
+    args = parse_args()
+    if args.server:
+        solve_remotely(args)
+        return
+    puzzle = load_puzzle(args.puzzle)
+    if args.count or args.enumerate is not None:
+        print_optimal_solutions(puzzle, args)
+        return
+    if args.timeout is not None:
+        args.options["deadline"] = time.monotonic() + args.timeout
+    if args.cache:
+        with cache.SolutionCache(args.cache) as solutions:
+            solution = solutions.solve(puzzle, args.strategy,
+                                       **args.options)
+            if args.cache_stats:
+                solutions.print_stats()
+    else:
+        solution = solver.run(puzzle, args.strategy, **args.options)
     if solution:
         print_solution(puzzle, solution)
+    elif isinstance(solution, solver.BudgetExceeded):
+        print("ERROR: Reached the {} after {} states and {:.2f}s; every "
+              "solution has more than {} moves".format(
+                  solution.reason, solution.states, solution.elapsed,
+                  solution.depth))
     else:
         print("This puzzle is unsolvable")
+    if args.stats == "json":
+        args.options["stats"].print_json()
+    elif args.stats == "text":
+        args.options["stats"].print_text()
+    if isinstance(solution, solver.BudgetExceeded):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
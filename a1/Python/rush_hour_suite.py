@@ -0,0 +1,150 @@
+#!/bin/env python3
+
+
+###############################################################################
+#
+# rush_hour_suite.py
+#
+# Rush Hour puzzle solver
+# (C) 2019 Norbert Zeh (nzeh@cs.dal.ca)
+#
+###############################################################################
+
+
+"""This module provides the boiler plate code of the benchmark suite.  The
+run command picks puzzles from the database in tiers of moves and cluster
+sizes, runs all solver strategies on them, and writes the results to
+../exec-stats.csv and, optionally, a JSON file.  The compare command compares
+two such result files and reports regressions; its exit status is 1 if there
+are any."""
+
+
+import argparse
+import sys
+from rush_hour import puzzle_db, solver, suite
+
+
+def parse_puzzles(args, path):
+    """Look up the puzzles with the given numbers in the database."""
+    puzzles = []
+    with puzzle_db.PuzzleDB(path) as database:
+        for number in args:
+            try:
+                moves, board, size = database.puzzle(number)
+            except IndexError:
+                print("ERROR: There is no puzzle {}".format(number))
+                sys.exit(1)
+            puzzles.append((number, board, moves, size))
+    return puzzles
+
+
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Rush Hour solver strategies.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmark suite")
+    run.add_argument("puzzles", nargs="*", type=int,
+                     help="puzzle numbers (default: a sample of every tier)")
+    run.add_argument("-s", "--strategy", action="append",
+                     choices=solver.STRATEGIES, dest="strategies",
+                     help="strategy to run; may be repeated (default: all)")
+    run.add_argument("--per-tier", type=int, default=2,
+                     help="puzzles per tier (default: 2)")
+    run.add_argument("--seed", type=int, default=0,
+                     help="seed for picking puzzles (default: 0)")
+    run.add_argument("-w", "--warmups", type=int, default=1,
+                     help="warmup runs per puzzle (default: 1)")
+    run.add_argument("-r", "--repeats", type=int, default=3,
+                     help="measured runs per puzzle (default: 3)")
+    run.add_argument("-t", "--timeout", type=float, default=60.0,
+                     help="time limit for all runs of a strategy on a "
+                     "puzzle in seconds (default: 60)")
+    run.add_argument("-m", "--memory", type=int, default=None,
+                     help="memory limit per run in MB")
+    run.add_argument("--database", default=puzzle_db.DEFAULT_PATH,
+                     help="text puzzle database (default: {})".format(
+                         puzzle_db.DEFAULT_PATH))
+    run.add_argument("-o", "--output", default="../exec-stats.csv",
+                     help="CSV file to write results to (default: "
+                     "../exec-stats.csv)")
+    run.add_argument("--json", metavar="PATH",
+                     help="also write the results and a description of the "
+                     "machine to this JSON file")
+    compare = commands.add_parser("compare",
+                                  help="compare two result files")
+    compare.add_argument("old", help="CSV or JSON file of the earlier run")
+    compare.add_argument("new", help="CSV or JSON file of the later run")
+    compare.add_argument("--threshold", type=float, default=10.0,
+                         help="percentage by which a measurement may grow "
+                         "before it is reported (default: 10)")
+    return parser.parse_args()
+
+
+def run_suite(args):
+    """Run the benchmark suite as described by the command line arguments."""
+    if args.puzzles:
+        puzzles = parse_puzzles(args.puzzles, args.database)
+    else:
+        puzzles = suite.select_puzzles(args.database, args.per_tier,
+                                       args.seed)
+    strategies = args.strategies or solver.STRATEGIES
+    memory_limit = args.memory << 20 if args.memory else None
+    results = []
+    rows = suite.run_suite(puzzles, strategies, args.warmups, args.repeats,
+                           args.timeout, memory_limit)
+    with open(args.output, "w", newline="") as file:
+        suite.write_csv(file, _report(rows, results))
+    if args.json:
+        with open(args.json, "w") as file:
+            suite.write_json(file, results, suite.environment(
+                seed=args.seed, per_tier=args.per_tier,
+                warmups=args.warmups, repeats=args.repeats,
+                timeout=args.timeout, memory_limit_mb=args.memory))
+
+
+def _report(rows, results):
+    """Print a progress line for every result in rows and collect the
+    results in the given list."""
+    for result in rows:
+        print("{:>8}  {:>8}  {:14}  {}".format(
+            result.puzzle, result.strategy, result.status,
+            "-" if result.wall_time_s is None else
+            "{:.3f}s".format(result.wall_time_s)), file=sys.stderr)
+        results.append(result)
+        yield result
+
+
+def compare_results(args):
+    """Compare two result files and report the regressions."""
+    regressions = suite.compare(suite.read_results(args.old),
+                                suite.read_results(args.new),
+                                args.threshold / 100)
+    if not regressions:
+        print("No regressions")
+        return 0
+    print("{:>8}  {:>8}  {:>12}  {:>12}  {:>12}".format(
+        "Puzzle", "Strategy", "Field", "Old", "New"))
+    for (puzzle, strategy, field, old, new) in regressions:
+        print("{:>8}  {:>8}  {:>12}  {:>12}  {:>12}".format(
+            puzzle, strategy, field, _format(old), _format(new)))
+    return 1
+
+
+def _format(value):
+    """Format a measurement for the regression table."""
+    if isinstance(value, float):
+        return "{:.4f}".format(value)
+    return str(value)
+
+
+def main():
+    """Main function"""
+    args = parse_args()
+    if args.command == "compare":
+        sys.exit(compare_results(args))
+    run_suite(args)
+
+
+if __name__ == "__main__":
+    main()